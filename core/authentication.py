@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# Only what authentication and the permission checks read. The password
+# hash itself never goes into the cache, just the digest tokens carry.
+CACHED_FIELDS = ['id', 'is_active', 'is_staff', 'is_superuser']
+
+
+def _cache_key(user_id):
+    return f'core:auth-user:{user_id}'
+
+
+def forget_user(user_id):
+    """Drop the cached copy of a user, e.g. once it's saved or deleted."""
+    cache.delete(_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps the users it loads in the cache for
+    `settings.AUTH_USER_CACHE_TIMEOUT` seconds instead of reading them on every
+    request. Only `CACHED_FIELDS` and the password digest are cached; the user
+    is rebuilt with its other fields deferred, so they're read on access.
+    Saving or deleting a user drops its copy once the change commits, so with
+    a shared cache a deactivation or a password change applies to the very
+    next request, and to one within the timeout otherwise.
+
+    The token's version, the password hash claim it was issued with, is checked
+    against the user's, so changing a password revokes the tokens issued before.
+    Tokens issued without the claim are accepted until they expire.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as error:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from error
+
+        key = _cache_key(user_id)
+        cached = cache.get(key)
+        if cached is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as error:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from error
+            cached = {
+                'fields': {field: getattr(user, field) for field in CACHED_FIELDS},
+                'version': get_md5_hash_password(user.password),
+            }
+            cache.set(key, cached, settings.AUTH_USER_CACHE_TIMEOUT)
+        user = self._rebuild(cached['fields'])
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        version = validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+        if version is not None and version != cached['version']:
+            raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
+
+    def _rebuild(self, fields):
+        # from_db() takes the values in the model's field order.
+        names = [field.attname for field in self.user_model._meta.concrete_fields if field.attname in fields]
+        return self.user_model.from_db(
+            router.db_for_read(self.user_model), names, [fields[name] for name in names])
@@ -1,4 +1,7 @@
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer, UserSerializer as BaseUserSerializer
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer as BaseTokenObtainPairSerializer
+
+from store.models import Customer
 
 
 class UserCreateSerializer(BaseUserCreateSerializer):
@@ -9,3 +12,17 @@ class UserCreateSerializer(BaseUserCreateSerializer):
 class UserSerializer(BaseUserSerializer):
     class Meta(BaseUserSerializer.Meta):
         fields = ('id', 'username', 'email', 'first_name', 'last_name' )
+
+
+class TokenObtainPairSerializer(BaseTokenObtainPairSerializer):
+    """
+    Adds `customer_id` and `is_staff` claims, so requests don't have to look
+    them up. Access tokens made from a refresh token copy its claims, so they
+    reflect the user as of logging in.
+    """
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token['customer_id'] = Customer.objects.filter(user_id=user.id).order_by('id').values_list('id', flat=True).first()
+        token['is_staff'] = user.is_staff
+        return token
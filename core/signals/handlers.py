@@ -1,6 +1,18 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from core.authentication import forget_user
 from store.signals import order_created
 
 @receiver(order_created)
 def on_order_created(sender, **kwargs):
-    print('order_created', kwargs['order'])
\ No newline at end of file
+    print('order_created', kwargs['order'])
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, **kwargs):
+    # Covers deactivation and password changes, which are saves too. Waits
+    # for the commit so a concurrent request can't cache the old row again.
+    user_id = kwargs['instance'].pk
+    transaction.on_commit(lambda: forget_user(user_id))
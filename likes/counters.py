@@ -0,0 +1,145 @@
+import time
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from likes.models import Like
+from likes.signals import likes_flushed
+
+# Objects liked or unliked are listed per bucket of this many seconds, and a
+# bucket is only flushed once the one after it has closed too.
+BUCKET_SECONDS = 10
+# How far back to look for buckets when the flush watermark is missing.
+LOOKBACK_BUCKETS = 60
+DIRTY_TIMEOUT = 24 * 60 * 60
+# Delta keys expire this long after the last like or unlike of their object,
+# long after flush has moved their count out, so idle objects don't keep one.
+DELTA_TIMEOUT = 24 * 60 * 60
+
+FLUSHED_KEY = 'likes:flushed'
+
+
+def delta_key(content_type_id, object_id):
+    return f'likes:delta:{content_type_id}:{object_id}'
+
+
+def _bucket(now=None):
+    return int((time.time() if now is None else now) // BUCKET_SECONDS)
+
+
+def _add(key, delta, timeout=None):
+    """Atomic add that creates the key if needed; `incr()` alone refuses missing keys."""
+    if cache.add(key, delta, timeout):
+        return delta
+    return cache.incr(key, delta)
+
+
+def _mark_dirty(content_type_id, object_id):
+    bucket = _bucket()
+    ref = f'{content_type_id}:{object_id}'
+    if cache.add(f'likes:marked:{bucket}:{ref}', True, DIRTY_TIMEOUT):
+        slot = _add(f'likes:dirty:{bucket}', 1, DIRTY_TIMEOUT)
+        cache.set(f'likes:dirty:{bucket}:{slot}', ref, DIRTY_TIMEOUT)
+
+
+def _record(content_type_id, object_id, delta):
+    key = delta_key(content_type_id, object_id)
+    # Deleting a flushed key could lose a like recorded in between, so it expires instead.
+    if _add(key, delta, DELTA_TIMEOUT) != delta:
+        cache.touch(key, DELTA_TIMEOUT)
+    _mark_dirty(content_type_id, object_id)
+
+
+def like(user, obj):
+    """Like `obj` on behalf of `user`. Returns False if it was already liked."""
+    content_type = ContentType.objects.get_for_model(obj)
+    _, created = Like.objects.get_or_create(user=user, content_type=content_type, object_id=obj.pk)
+    if created:
+        _record(content_type.id, obj.pk, 1)
+    return created
+
+
+def unlike(user, obj):
+    """Take back `user`'s like of `obj`. Returns False if there was none."""
+    content_type = ContentType.objects.get_for_model(obj)
+    deleted, _ = Like.objects.filter(user=user, content_type=content_type, object_id=obj.pk).delete()
+    if deleted:
+        _record(content_type.id, obj.pk, -1)
+    return bool(deleted)
+
+
+def pending(obj):
+    """Likes of `obj` recorded in the cache but not flushed to its likes_count yet."""
+    content_type = ContentType.objects.get_for_model(obj)
+    return cache.get(delta_key(content_type.id, obj.pk), 0)
+
+
+def flush(now=None):
+    """
+    Move the buffered like counts into the `likes_count` column of the liked
+    objects, one UPDATE per model. Counts are taken out of the cache with a
+    decrement, so likes recorded while flushing carry over to the next run.
+    Returns the number of objects updated.
+    """
+    current = _bucket(now)
+    start = cache.get(FLUSHED_KEY, current - LOOKBACK_BUCKETS)
+
+    refs = set()
+    for bucket in range(start, current - 1):
+        slots = cache.get(f'likes:dirty:{bucket}', 0)
+        if slots:
+            refs.update(cache.get_many([f'likes:dirty:{bucket}:{slot}' for slot in range(1, slots + 1)]).values())
+
+    keys = {ref: f'likes:delta:{ref}' for ref in refs}
+    values = cache.get_many(keys.values())
+
+    deltas = defaultdict(dict)
+    for ref, key in keys.items():
+        if values.get(key):
+            content_type_id, object_id = ref.split(':')
+            deltas[int(content_type_id)][int(object_id)] = values[key]
+
+    # Models without a likes_count column only keep their Like rows.
+    counted = {}
+    for content_type_id in deltas:
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is not None and 'likes_count' in [field.name for field in model._meta.fields]:
+            counted[content_type_id] = model
+
+    with transaction.atomic():
+        for content_type_id, model in counted.items():
+            objects = deltas[content_type_id]
+            increment = Case(*[When(pk=pk, then=Value(delta)) for pk, delta in objects.items()], default=Value(0))
+            model.objects.filter(pk__in=objects).update(likes_count=F('likes_count') + increment)
+
+    for content_type_id, objects in deltas.items():
+        for object_id, delta in objects.items():
+            cache.decr(delta_key(content_type_id, object_id), delta)
+
+    cache.set(FLUSHED_KEY, current - 1, None)
+
+    for content_type_id, model in counted.items():
+        likes_flushed.send_robust(sender=model, object_ids=list(deltas[content_type_id]))
+
+    return sum(len(deltas[content_type_id]) for content_type_id in counted)
+
+
+def recount(model):
+    """
+    Rebuild `likes_count` of every `model` row from the Like table, for when
+    buffered counts were lost (e.g. the cache was flushed). Returns the number
+    of rows corrected.
+    """
+    actual = Coalesce(Subquery(
+        Like.objects.filter(content_type=ContentType.objects.get_for_model(model), object_id=OuterRef('pk'))
+        .order_by()
+        .values('object_id')
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+    return model.objects.exclude(likes_count=actual).update(likes_count=actual)
@@ -0,0 +1,20 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from likes.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the likes_count column of a model from its Like rows, e.g. after the cache was lost.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='app_label.ModelName, e.g. store.Product')
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as error:
+            raise CommandError(error)
+
+        corrected = recount(model)
+        self.stdout.write(self.style.SUCCESS(f'Corrected likes_count on {corrected} rows.'))
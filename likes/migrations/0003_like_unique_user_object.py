@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:37
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    # Keep the first like of every (user, object); the rest were double clicks.
+    Like = apps.get_model('likes', 'Like')
+
+    duplicates = Like.objects.values('user', 'content_type', 'object_id') \
+        .annotate(count=Count('id'), first_id=Min('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        Like.objects.filter(
+            user=duplicate['user'], content_type=duplicate['content_type'], object_id=duplicate['object_id']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('likes', '0002_alter_like_options'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['content_type', 'object_id'], name='likes_like_content_5c134b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'content_type', 'object_id'), name='unique_like_per_user'),
+        ),
+    ]
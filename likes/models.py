@@ -15,4 +15,11 @@ class Like(models.Model):
         return self.user
 
     class Meta:
-        ordering = ['user']
\ No newline at end of file
+        ordering = ['user']
+        constraints = [
+            # Makes liking idempotent: a second like by the same user is a no-op.
+            models.UniqueConstraint(fields=['user', 'content_type', 'object_id'], name='unique_like_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+        ]
@@ -0,0 +1,4 @@
+from django.dispatch import Signal
+
+# Sent with `object_ids` after buffered like counts were written to the sender model.
+likes_flushed = Signal()
@@ -0,0 +1,14 @@
+import logging
+
+from celery import shared_task
+
+from likes.counters import flush
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_like_counts():
+    flushed = flush()
+    logger.info('Flushed like counts of %s objects.', flushed)
+    return flushed
@@ -25,6 +25,13 @@ class WebsiteUser(HttpUser):
                          name='/store/carts/items',
                          json={'product_id': product_id, 'quantity': 1})
 
+    @task(1)
+    def add_many_to_cart(self):
+        print('add_many_to_cart')
+        self.client.post(f'/store/carts/{self.cart_id}/items/',
+                         name='/store/carts/items (batch)',
+                         json=[{'product_id': randint(10, 20), 'quantity': 1} for _ in range(5)])
+
     @task(1)
     def say_hello(self):
         print('say_hello')
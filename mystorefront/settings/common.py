@@ -13,6 +13,8 @@ import os
 import os.path
 from pathlib import Path
 from datetime import timedelta
+from celery.schedules import crontab
+from corsheaders.defaults import default_headers
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'playground.apps.PlaygroundConfig',
     'debug_toolbar',
     'rest_framework',
@@ -71,6 +74,11 @@ CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
 ]
 
+CORS_ALLOW_HEADERS = (
+    *default_headers,
+    'idempotency-key',
+)
+
 ROOT_URLCONF = 'mystorefront.urls'
 
 TEMPLATES = [
@@ -143,7 +151,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False,
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
 }
 
@@ -151,6 +159,9 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('JWT',),
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_OBTAIN_SERIALIZER': 'core.serializers.TokenObtainPairSerializer',
+    # Issue tokens with a hash of the password, so changing it revokes them.
+    'CHECK_REVOKE_TOKEN': True,
 }
 
 DJOSER = {
@@ -181,7 +192,33 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'playground.tasks.notify_customers',
         'schedule': timedelta(seconds=5),
         'args': ('Hello world',),
-    }
+    },
+    'reconcile_collection_counts': {
+        'task': 'store.tasks.reconcile_collection_counts',
+        'schedule': crontab(minute=0, hour=3),
+    },
+    'delete_stale_carts': {
+        # Off-peak, it deletes in small batches but still churns the cart tables.
+        'task': 'store.tasks.delete_stale_cart_batches',
+        'schedule': crontab(minute=30, hour=4),
+    },
+    'dispatch_outbox': {
+        # Catches events whose dispatch after commit didn't happen, and retries.
+        'task': 'store.tasks.dispatch_outbox',
+        'schedule': timedelta(seconds=30),
+    },
+    'purge_outbox': {
+        'task': 'store.tasks.purge_outbox',
+        'schedule': crontab(minute=0, hour=5),
+    },
+    'rollup_sales_reports': {
+        'task': 'store.tasks.rollup_sales_reports',
+        'schedule': crontab(minute=5),
+    },
+    'flush_like_counts': {
+        'task': 'likes.tasks.flush_like_counts',
+        'schedule': timedelta(minutes=1),
+    },
 }
 
 CACHES = {
@@ -195,6 +232,20 @@ CACHES = {
     }
 }
 
+CATALOG_CACHE_TIMEOUT = 10 * 60
+
+# 'store.carts.CacheCartStorage' keeps new carts in the cache until checkout.
+CART_STORAGE = 'store.carts.DatabaseCartStorage'
+CART_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+# Carts created longer ago than this are deleted by store.tasks.delete_stale_cart_batches.
+STALE_CART_AGE_DAYS = 30
+
+# How long responses to requests with an Idempotency-Key header are replayed for.
+IDEMPOTENCY_KEY_TIMEOUT = 24 * 60 * 60
+
+# How long authenticated users are kept in the cache, see core.authentication.
+AUTH_USER_CACHE_TIMEOUT = 60
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
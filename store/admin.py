@@ -3,7 +3,10 @@ from django.db.models import Count
 from django.urls import reverse
 from django.utils.html import format_html, urlencode
 
-from .models  import Collection, Product, Cart, Customer, Promotion, Address, CartItem, Order, OrderItem, ProductImage
+from . import outbox
+from .payments import UPDATED, transition_payment_statuses
+from .models  import Collection, Product, Cart, Customer, Promotion, Address, CartItem, Order, OrderItem, ProductImage, \
+    OutboxEvent
 
 
 class InventoryFilter(admin.SimpleListFilter):
@@ -31,7 +34,9 @@ class ProductImageInline(admin.TabularInline):
     readonly_fields = ('thumbnail',)
 
     def thumbnail(self, instance):
-        if instance.image.name != '':
+        if 'thumbnail' in instance.variants:
+            return format_html('<img src="{}" class="thumbnail" />', instance.image.storage.url(instance.variants['thumbnail']))
+        elif instance.image.name != '':
             return format_html('<img src="{}" class="thumbnail" />', instance.image.url)
         else:
             return ''
@@ -116,6 +121,22 @@ class OrderAdmin(admin.ModelAdmin):
     list_display = ['id', 'placed_at', 'customer', 'payment_status']
     list_per_page = 10
     inlines = [OrderItemInline]
+    actions = ['mark_complete', 'mark_failed']
+
+    def transition(self, request, queryset, payment_status):
+        outcomes = transition_payment_statuses(
+            {order_id: payment_status for order_id in queryset.values_list('id', flat=True)})
+        updated_count = sum(outcome == UPDATED for outcome in outcomes.values())
+        self.message_user(request, f'{updated_count} of {len(outcomes)} orders were successfully updated.',
+                          messages.INFO)
+
+    @admin.action(description='Mark payment as complete')
+    def mark_complete(self, request, queryset):
+        self.transition(request, queryset, Order.PAYMENT_STATUS_COMPLETE)
+
+    @admin.action(description='Mark payment as failed')
+    def mark_failed(self, request, queryset):
+        self.transition(request, queryset, Order.PAYMENT_STATUS_FAILED)
 
 
 @admin.register(Collection)
@@ -129,11 +150,22 @@ class CollectionAdmin(admin.ModelAdmin):
 
         return format_html('<a href={}>{}</a>', url, collection.products_count)
 
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(products_count=Count('products'))
-
 
 # Register your models here.
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'topic', 'created_at', 'attempts', 'available_at', 'delivered_at', 'failed_at']
+    list_filter = ['topic', ('failed_at', admin.EmptyFieldListFilter)]
+    list_per_page = 50
+    readonly_fields = ['topic', 'payload', 'created_at', 'attempts', 'last_error', 'delivered_at', 'failed_at']
+    actions = ['retry']
+
+    @admin.action(description='Retry failed events')
+    def retry(self, request, queryset):
+        retried_count = outbox.retry_failed(queryset)
+        self.message_user(request, f'{retried_count} events were put back for delivery.', messages.INFO)
+
+
 # admin.site.register(Collection)
 # admin.site.register(Product)
 # admin.site.register(Customer)
@@ -0,0 +1,145 @@
+import hashlib
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from store.conditional import not_modified
+
+PRODUCTS = 'products'
+COLLECTIONS = 'collections'
+
+CACHED_HEADERS = ['ETag', 'Last-Modified']
+
+
+def _version_key(namespace):
+    return f'store:catalog:{namespace}:version'
+
+
+def _stats_key(namespace, outcome):
+    return f'store:catalog:{namespace}:{outcome}'
+
+
+def get_version(namespace):
+    # Versions start from the current time so a version key that was evicted can
+    # never come back at a number that old entries were stored under.
+    return cache.get_or_set(_version_key(namespace), int(time.time() * 1000), None)
+
+
+def bump_version(namespace):
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        get_version(namespace)
+
+
+def invalidate(*namespaces):
+    """
+    Drop every cached response in the given namespaces once the current
+    transaction commits, so readers can't re-cache rows that are about to change.
+    """
+    def bump():
+        for namespace in namespaces:
+            bump_version(namespace)
+
+    transaction.on_commit(bump)
+
+
+class LockNotAcquired(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Another request is changing this resource, try again.'
+    default_code = 'locked'
+
+
+@contextmanager
+def lock(name, timeout=10, wait=5):
+    """
+    Hold a lock on `name` across every process sharing the cache, for at most
+    `timeout` seconds. Raises LockNotAcquired after waiting `wait` seconds.
+    """
+    key = f'store:lock:{name}'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + wait
+    while not cache.add(key, token, timeout):
+        if time.monotonic() >= deadline:
+            raise LockNotAcquired()
+        time.sleep(0.05)
+
+    try:
+        yield
+    finally:
+        # Don't release a lock that timed out and was taken over by someone else.
+        if cache.get(key) == token:
+            cache.delete(key)
+
+
+def _record(namespace, outcome):
+    key = _stats_key(namespace, outcome)
+    if not cache.add(key, 1, None):
+        cache.incr(key)
+
+
+def get_stats(namespace):
+    return {
+        'hits': cache.get(_stats_key(namespace, 'hits'), 0),
+        'misses': cache.get(_stats_key(namespace, 'misses'), 0),
+    }
+
+
+def reset_stats(namespace):
+    cache.delete_many([_stats_key(namespace, 'hits'), _stats_key(namespace, 'misses')])
+
+
+def build_key(namespace, request):
+    query = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = f'{request.get_host()}{request.path}?{urlencode(query, doseq=True)}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'store:catalog:{namespace}:v{get_version(namespace)}:{digest}'
+
+
+class CachedReadMixin:
+    """
+    Read-through cache for anonymous `list` and `retrieve` calls. Entries are keyed
+    on the namespace version, so the signal handlers invalidate a whole namespace
+    with one `incr` instead of hunting down individual keys.
+
+    Validator headers are cached with the body, so conditional requests that hit
+    the cache are answered with a 304 without touching the database.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return handler(request, *args, **kwargs)
+
+        key = build_key(self.cache_namespace, request)
+        cached = cache.get(key)
+        if cached is not None:
+            _record(self.cache_namespace, 'hits')
+            data, headers = cached
+            response = not_modified(request, headers.get('ETag'), headers.get('Last-Modified')) or Response(data)
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _record(self.cache_namespace, 'misses')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {header: response[header] for header in CACHED_HEADERS if response.has_header(header)}
+            cache.set(key, (response.data, headers), settings.CATALOG_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,332 @@
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import NotFound
+
+from store.caching import lock
+from store.models import Cart, CartItem, Product
+from store.pricing import annotate_cart_totals, annotate_line_totals
+
+
+def get_cart_storage():
+    """The backend named by `settings.CART_STORAGE`."""
+    return import_string(settings.CART_STORAGE)()
+
+
+def _to_pk(model, value):
+    try:
+        return model._meta.pk.to_python(value)
+    except ValidationError:
+        return None
+
+
+class DatabaseCartStorage:
+    """Carts kept as Cart and CartItem rows."""
+
+    def create(self):
+        return Cart.objects.create()
+
+    def get(self, cart_id):
+        cart_id = _to_pk(Cart, cart_id)
+        if cart_id is None:
+            return None
+        items = annotate_line_totals(CartItem.objects.select_related('product'), 'product__unit_price')
+        return annotate_cart_totals(Cart.objects.filter(pk=cart_id)) \
+            .prefetch_related(Prefetch('items', queryset=items)) \
+            .first()
+
+    def delete(self, cart_id):
+        cart_id = _to_pk(Cart, cart_id)
+        if cart_id is not None:
+            Cart.objects.filter(pk=cart_id).delete()
+
+    def get_items(self, cart_id):
+        cart_id = _to_pk(Cart, cart_id)
+        if cart_id is None:
+            return CartItem.objects.none()
+        return annotate_line_totals(CartItem.objects.filter(cart_id=cart_id).select_related('product'),
+                                    'product__unit_price')
+
+    def get_item(self, cart_id, item_id):
+        item_id = _to_pk(CartItem, item_id)
+        if item_id is None:
+            return None
+        return self.get_items(cart_id).filter(pk=item_id).first()
+
+    def add_items(self, cart_id, quantities):
+        """
+        Add `{product_id: quantity}` to a cart in a single INSERT ... ON CONFLICT
+        that sums into existing items, so concurrent adds never lose an update.
+        Returns the items and the ids of products that don't exist, which are
+        left out.
+
+        The VALUES rows are joined to the product and cart tables rather than left
+        to the foreign keys, which PostgreSQL only checks at commit.
+        """
+        cart_id = _to_pk(Cart, cart_id)
+        if cart_id is None:
+            raise NotFound('No cart with given id was found!')
+        if not quantities:
+            return [], []
+
+        item_table = connection.ops.quote_name(CartItem._meta.db_table)
+        rows = ', '.join(['(CAST(%s AS integer), CAST(%s AS integer))'] * len(quantities))
+        sql = f'''
+            INSERT INTO {item_table} (cart_id, product_id, quantity)
+            SELECT cart.id, product.id, requested.column2
+            FROM (VALUES {rows}) AS requested
+            JOIN {connection.ops.quote_name(Product._meta.db_table)} AS product ON product.id = requested.column1
+            JOIN {connection.ops.quote_name(Cart._meta.db_table)} AS cart ON cart.id = %s
+            WHERE true
+            ON CONFLICT (product_id, cart_id) DO UPDATE SET quantity = {item_table}.quantity + excluded.quantity
+            RETURNING id, product_id, quantity
+        '''
+        params = [value for item in quantities.items() for value in item]
+        params.append(Cart._meta.pk.get_db_prep_value(cart_id, connection))
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            items = [
+                CartItem(id=item_id, cart_id=cart_id, product_id=product_id, quantity=quantity)
+                for item_id, product_id, quantity in cursor.fetchall()
+            ]
+
+        if not items and not Cart.objects.filter(pk=cart_id).exists():
+            raise NotFound('No cart with given id was found!')
+
+        missing = set(quantities) - {item.product_id for item in items}
+        return items, sorted(missing)
+
+    def update_item(self, cart_id, item_id, quantity):
+        CartItem.objects.filter(cart_id=cart_id, pk=item_id).update(quantity=quantity)
+        return self.get_item(cart_id, item_id)
+
+    def delete_item(self, cart_id, item_id):
+        CartItem.objects.filter(cart_id=cart_id, pk=item_id).delete()
+
+    def count_items(self, cart_id):
+        """How many items the cart has, or None if there's no such cart."""
+        cart_id = _to_pk(Cart, cart_id)
+        if cart_id is None:
+            return None
+        return Cart.objects.filter(pk=cart_id).annotate(item_count=Count('items')) \
+            .values_list('item_count', flat=True).first()
+
+    def write(self, cart_id):
+        """Make sure the cart is stored as rows; these carts always are."""
+
+    def restore(self, cart_id):
+        """Undo `write` after the transaction it ran in was rolled back; nothing to undo here."""
+
+    def persist(self, cart_id):
+        """Make sure the cart is stored as rows and return it, or None if there's no such cart."""
+        self.write(cart_id)
+        return DatabaseCartStorage.get(self, cart_id)
+
+
+class CacheCartStorage(DatabaseCartStorage):
+    """
+    New carts live in the cache only, for `settings.CART_CACHE_TIMEOUT` seconds
+    since they were last used, and are written to the database when they are
+    persisted, e.g. at checkout. Carts already in the database are served from
+    there. The id of an item in a cached cart is its product id.
+    """
+
+    def _key(self, cart_id):
+        return f'store:cart:{cart_id}'
+
+    def _load(self, cart_id):
+        cart_id = _to_pk(Cart, cart_id)
+        if cart_id is None:
+            return None, None
+        data = cache.get(self._key(cart_id))
+        # A written cart is served from the database, even before its rows are committed.
+        if data is not None and data.get('written'):
+            return cart_id, None
+        return cart_id, data
+
+    def _save(self, cart_id, data):
+        cache.set(self._key(cart_id), data, settings.CART_CACHE_TIMEOUT)
+
+    def _build(self, cart_id, data):
+        # Shaped like the rows prefetch_related('items__product') would give; the
+        # serializers add up the totals themselves.
+        products = Product.objects.only('id', 'title', 'unit_price').in_bulk(list(data['items']))
+        cart = Cart(id=cart_id, created_at=data['created_at'])
+        items = [
+            CartItem(id=product_id, cart=cart, product=products[product_id], quantity=quantity)
+            for product_id, quantity in data['items'].items() if product_id in products
+        ]
+        cart._prefetched_objects_cache = {'items': items}
+        return cart
+
+    def create(self):
+        cart = Cart(created_at=timezone.now())
+        data = {'created_at': cart.created_at, 'items': {}}
+        self._save(cart.id, data)
+        return self._build(cart.id, data)
+
+    def get(self, cart_id):
+        cart_id, data = self._load(cart_id)
+        if data is None:
+            return super().get(cart_id)
+        cache.touch(self._key(cart_id), settings.CART_CACHE_TIMEOUT)
+        return self._build(cart_id, data)
+
+    def delete(self, cart_id):
+        cart_id, data = self._load(cart_id)
+        if data is None:
+            return super().delete(cart_id)
+        cache.delete(self._key(cart_id))
+
+    def get_items(self, cart_id):
+        cart_id, data = self._load(cart_id)
+        if data is None:
+            return super().get_items(cart_id)
+        return list(self._build(cart_id, data).items.all())
+
+    def get_item(self, cart_id, item_id):
+        cart_id, data = self._load(cart_id)
+        if data is None:
+            return super().get_item(cart_id, item_id)
+        item_id = _to_pk(CartItem, item_id)
+        return next((item for item in self.get_items(cart_id) if item.id == item_id), None)
+
+    def add_items(self, cart_id, quantities):
+        cart_id, data = self._load(cart_id)
+        if data is None:
+            return super().add_items(cart_id, quantities)
+
+        with lock(f'cart:{cart_id}'):
+            cart_id, data = self._load(cart_id)
+            if data is None:
+                return super().add_items(cart_id, quantities)
+
+            existing = set(Product.objects.filter(pk__in=quantities).values_list('pk', flat=True))
+            missing = sorted(set(quantities) - existing)
+            if missing:
+                return [], missing
+
+            for product_id, quantity in quantities.items():
+                data['items'][product_id] = data['items'].get(product_id, 0) + quantity
+            self._save(cart_id, data)
+
+        items = [
+            CartItem(id=product_id, cart_id=cart_id, product_id=product_id, quantity=data['items'][product_id])
+            for product_id in quantities
+        ]
+        return items, []
+
+    def update_item(self, cart_id, item_id, quantity):
+        cart_id = _to_pk(Cart, cart_id)
+        with lock(f'cart:{cart_id}'):
+            cart_id, data = self._load(cart_id)
+            if data is None:
+                return super().update_item(cart_id, item_id, quantity)
+            item_id = _to_pk(CartItem, item_id)
+            if item_id in data['items']:
+                data['items'][item_id] = quantity
+                self._save(cart_id, data)
+        return self.get_item(cart_id, item_id)
+
+    def delete_item(self, cart_id, item_id):
+        cart_id = _to_pk(Cart, cart_id)
+        with lock(f'cart:{cart_id}'):
+            cart_id, data = self._load(cart_id)
+            if data is None:
+                return super().delete_item(cart_id, item_id)
+            data['items'].pop(_to_pk(CartItem, item_id), None)
+            self._save(cart_id, data)
+
+    def count_items(self, cart_id):
+        cart_id, data = self._load(cart_id)
+        if data is None:
+            return super().count_items(cart_id)
+        return len(data['items'])
+
+    def write(self, cart_id):
+        """
+        Write the cached cart to the database in the current transaction. The
+        cached copy is marked written under the cart's lock, so later calls use
+        the rows instead of writing it or adding to it again; it's dropped once
+        the transaction commits, and `restore` must be called if it rolls back.
+        """
+        cart_id = _to_pk(Cart, cart_id)
+        with lock(f'cart:{cart_id}'):
+            cart_id, data = self._load(cart_id)
+            if data is None:
+                return
+
+            products = set(Product.objects.filter(pk__in=list(data['items'])).values_list('pk', flat=True))
+            with transaction.atomic():
+                cart, created = Cart.objects.get_or_create(id=cart_id)
+                if created:
+                    # auto_now_add stamped it with the time of writing, not of creating the cart.
+                    Cart.objects.filter(pk=cart_id).update(created_at=data['created_at'])
+                CartItem.objects.bulk_create([
+                    CartItem(cart=cart, product_id=product_id, quantity=quantity)
+                    for product_id, quantity in data['items'].items() if product_id in products
+                ], ignore_conflicts=True)
+
+            self._save(cart_id, {**data, 'written': True})
+            # Only forget the cached cart once the rows are there for good.
+            transaction.on_commit(lambda: cache.delete(self._key(cart_id)))
+
+    def restore(self, cart_id):
+        cart_id = _to_pk(Cart, cart_id)
+        with lock(f'cart:{cart_id}'):
+            data = cache.get(self._key(cart_id))
+            if data is not None and data.pop('written', False):
+                self._save(cart_id, data)
+
+
+STALE_CART_BATCH_SIZE = 500
+
+
+def delete_stale_carts(max_age_days=None, batch_size=STALE_CART_BATCH_SIZE, pause=0.1, progress=None):
+    """
+    Delete the carts created more than `max_age_days` ago (default
+    `settings.STALE_CART_AGE_DAYS`) with their items, `batch_size` carts per
+    short transaction and `pause` seconds between batches so row locks are
+    never held for long. `progress(carts, items)` is called with the running
+    totals after every batch. Returns the totals.
+    """
+    if max_age_days is None:
+        max_age_days = settings.STALE_CART_AGE_DAYS
+    cutoff = timezone.now() - timedelta(days=max_age_days)
+
+    carts = items = 0
+    while True:
+        with transaction.atomic():
+            batch = list(Cart.objects.filter(created_at__lt=cutoff).order_by('created_at')
+                         .values_list('pk', flat=True)[:batch_size])
+            if not batch:
+                break
+            _, deleted = Cart.objects.filter(pk__in=batch).delete()
+
+        carts += deleted.get(Cart._meta.label, 0)
+        items += deleted.get(CartItem._meta.label, 0)
+        if progress is not None:
+            progress(carts, items)
+
+        if len(batch) < batch_size:
+            break
+        time.sleep(pause)
+
+    return carts, items
+
+
+def merge_quantities(items):
+    """`[{'product_id': 1, 'quantity': 2}, ...]` -> `{product_id: total quantity}`"""
+    quantities = Counter()
+    for item in items:
+        quantities[item['product_id']] += item['quantity']
+    return dict(quantities)
@@ -0,0 +1,23 @@
+from store.models import Customer
+
+
+def get_claim(request, name):
+    """The token's `name` claim, or None if the request wasn't authenticated with a token carrying it."""
+    # request.auth is the validated token of a request authenticated with a JWT.
+    token = request.auth
+    return token.get(name) if token is not None and hasattr(token, 'get') else None
+
+
+def get_customer_id(request):
+    """
+    The id of the requesting user's customer, read from the token's
+    `customer_id` claim. Tokens issued before the claim existed fall back to a
+    lookup.
+    """
+    customer_id = get_claim(request, 'customer_id')
+    if customer_id is None:
+        # Ordered by id so Customer's default ordering doesn't join the users.
+        customer_id = Customer.objects.filter(user_id=request.user.id).order_by('id') \
+            .values_list('id', flat=True).first()
+    return customer_id
+
@@ -0,0 +1,81 @@
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, parse_http_date_safe
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest())
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """
+    Return a 304 response if the request's validators still match, otherwise None.
+    `last_modified` is the value of a previously sent Last-Modified header.
+    """
+    if last_modified is not None:
+        last_modified = parse_http_date_safe(last_modified)
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+class ConditionalGetMixin:
+    """
+    ETag and Last-Modified support for `list` and `retrieve`. The validators come
+    from one `max(last_update)` + `count(*)` query per source queryset, so a
+    matching If-None-Match / If-Modified-Since returns 304 before the serializer
+    runs.
+    """
+    last_modified_field = 'last_update'
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def get_conditional_sources(self):
+        """
+        Return the querysets whose rows make up the response. Override when the
+        response depends on more than the view's own queryset.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            except (TypeError, ValueError, ValidationError):
+                # Like get_object_or_404 does for lookups the field can't take.
+                raise Http404
+        return [queryset]
+
+    def get_validators(self):
+        parts = []
+        last_modified = None
+        for queryset in self.get_conditional_sources():
+            aggregate = queryset.order_by().aggregate(
+                last_modified=Max(self.last_modified_field), count=Count('pk'))
+            parts += [aggregate['last_modified'], aggregate['count']]
+
+            if aggregate['last_modified'] is not None:
+                last_modified = max(filter(None, [last_modified, aggregate['last_modified']]))
+
+        # The query string and the renderer pick what the body holds, so they're part of the tag.
+        return make_etag(self.request.get_full_path(), self.request.accepted_media_type, *parts), last_modified
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is not None:
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -0,0 +1,34 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from store.models import Collection, Product
+
+
+def adjust_products_count(collection_id, delta):
+    """
+    Atomically add `delta` to a collection's stored products_count. Touching
+    last_update keeps the collection's conditional GET validators current.
+    """
+    if collection_id is None or delta == 0:
+        return
+    Collection.objects.filter(pk=collection_id).update(
+        products_count=F('products_count') + delta, last_update=timezone.now())
+
+
+def reconcile_products_count():
+    """
+    Recount products per collection in a single UPDATE, only touching rows that
+    drifted (e.g. after raw SQL or queryset.update() moved products around).
+    Returns the number of collections that were corrected.
+    """
+    actual = Coalesce(Subquery(
+        Product.objects.filter(collection=OuterRef('pk'))
+        .order_by()
+        .values('collection')
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+    return Collection.objects.exclude(products_count=actual).update(
+        products_count=actual, last_update=timezone.now())
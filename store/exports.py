@@ -0,0 +1,38 @@
+import csv
+import json
+
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """A file-like object for csv.writer that hands back each line instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, serializer):
+    # iterator() streams from a server-side cursor and, given a chunk_size, runs
+    # the queryset's prefetch_related lookups once per chunk.
+    for instance in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield serializer.to_representation(instance)
+
+
+def stream_ndjson(rows):
+    encoder = JSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def stream_csv(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(row.get(column)) for column in columns])
+
+
+def _csv_value(value):
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, cls=JSONEncoder)
+    return value
@@ -0,0 +1,44 @@
+from rest_framework.permissions import SAFE_METHODS
+
+
+def get_requested_fields(request, available, optional=()):
+    """
+    Return the names in `available` selected by `?fields=a,b` and `?omit=c` on a
+    read request. `optional` names are only included when `?fields=` or
+    `?include=` asks for them. Unknown names are ignored and writes get every
+    non-optional field.
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return [name for name in available if name not in optional]
+
+    fields = _split(request.query_params.get('fields'))
+    omit = _split(request.query_params.get('omit'))
+    include = _split(request.query_params.get('include'))
+
+    return [
+        name for name in available
+        if (name in fields or name in include or (not fields and name not in optional)) and name not in omit
+    ]
+
+
+def _split(value):
+    return {name.strip() for name in value.split(',') if name.strip()} if value else set()
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that drops the fields not selected by `?fields=` / `?omit=`
+    from the top-level serializer of the request. Fields in `Meta.optional_fields`
+    are left out unless asked for.
+    """
+    def get_fields(self):
+        fields = super().get_fields()
+
+        optional = getattr(self.Meta, 'optional_fields', [])
+
+        # Nested serializers always render in full.
+        if self.root not in (self, self.parent):
+            return {name: field for name, field in fields.items() if name not in optional}
+
+        selected = get_requested_fields(self.context.get('request'), fields, optional)
+        return {name: field for name, field in fields.items() if name in selected}
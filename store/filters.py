@@ -1,8 +1,16 @@
-from django_filters.rest_framework import FilterSet
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, Q
+from django_filters.rest_framework import FilterSet, CharFilter
+from rest_framework.filters import SearchFilter, OrderingFilter
+from tags.models import TaggedItem
 from .models import Product
 
 
 class ProductFilter(FilterSet):
+    tag = CharFilter(method='filter_tag')
+
     class Meta:
         model = Product
         fields = {
@@ -10,3 +18,47 @@ class ProductFilter(FilterSet):
             'unit_price': ['gte', 'lte'],
         }
 
+    def filter_tag(self, queryset, name, value):
+        # Served by the (tag, content_type) index on TaggedItem.
+        tagged = TaggedItem.objects.filter(
+            tag__label=value, content_type=ContentType.objects.get_for_model(Product)).values('object_id')
+        return queryset.filter(pk__in=tagged)
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    Matches `?search=` against the trigger-maintained `search_vector` column (GIN
+    indexed) and annotates a `search_rank`. With `search_trigram_field` set on the
+    view, fuzzy matches on that field are included through its trigram index.
+
+    Databases other than PostgreSQL fall back to SearchFilter over `search_fields`.
+    """
+    search_config = 'english'
+
+    def filter_queryset(self, request, queryset, view):
+        if connection.vendor != 'postgresql':
+            return super().filter_queryset(request, queryset, view)
+
+        terms = ' '.join(self.get_search_terms(request))
+        if not terms:
+            return queryset
+
+        query = SearchQuery(terms, config=self.search_config, search_type='websearch')
+        condition = Q(search_vector=query)
+
+        trigram_field = getattr(view, 'search_trigram_field', None)
+        if trigram_field:
+            condition |= Q(**{f'{trigram_field}__trigram_similar': terms})
+
+        return queryset.filter(condition).annotate(search_rank=SearchRank(F('search_vector'), query))
+
+
+class SearchRankOrderingFilter(OrderingFilter):
+    """
+    Orders full-text search results by relevance unless the client asked for an
+    explicit `?ordering=`.
+    """
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param) and 'search_rank' in queryset.query.annotations:
+            return ['-search_rank']
+        return super().get_ordering(request, queryset, view)
@@ -0,0 +1,89 @@
+import functools
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from store.caching import lock
+
+HEADER = 'Idempotency-Key'
+
+
+def _is_authenticated(request):
+    return bool(request.user and request.user.is_authenticated)
+
+
+def _is_uuid(key):
+    try:
+        uuid.UUID(key)
+    except ValueError:
+        return False
+    return True
+
+
+def _cache_key(request, key):
+    # Anonymous callers all share a scope, which is why their keys must be UUIDs.
+    scope = request.user.pk if _is_authenticated(request) else 'anonymous'
+    raw = f'{scope}:{request.method}:{request.path}:{key}'
+    return f'store:idempotency:{hashlib.md5(raw.encode("utf-8")).hexdigest()}'
+
+
+def _fingerprint(request):
+    return hashlib.md5(json.dumps(request.data, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _replay(stored, fingerprint):
+    if stored['fingerprint'] != fingerprint:
+        return Response({'error': f'This {HEADER} was already used with a different request body.'},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    response = Response(stored['data'], status=stored['status'], headers=stored['headers'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Let clients retry a POST safely by sending an `Idempotency-Key` header. The
+    first successful response for a key is kept for
+    `settings.IDEMPOTENCY_KEY_TIMEOUT` seconds and replayed for any request
+    repeating the key; a duplicate that arrives while the first is still running
+    waits for its response instead of running again. Error responses aren't
+    kept, so those requests run again when retried, e.g. once items are back in
+    stock. Anonymous callers must send a UUID, so their keys can't collide.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if not _is_authenticated(request) and not _is_uuid(key):
+            return Response({'error': f'{HEADER} must be a UUID.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request)
+
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return _replay(stored, fingerprint)
+
+        with lock(cache_key, timeout=30, wait=10):
+            stored = cache.get(cache_key)
+            if stored is not None:
+                return _replay(stored, fingerprint)
+
+            response = view_method(self, request, *args, **kwargs)
+            if status.is_success(response.status_code):
+                cache.set(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'headers': dict(response.items()),
+                }, settings.IDEMPOTENCY_KEY_TIMEOUT)
+            return response
+
+    return wrapper
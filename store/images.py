@@ -0,0 +1,64 @@
+import hashlib
+import io
+import os
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# name: (box size in pixels, Pillow format, crop to the exact box)
+VARIANTS = {
+    'thumbnail': (150, 'JPEG', True),
+    'small': (480, 'WEBP', False),
+    'large': (1200, 'WEBP', False),
+}
+
+EXTENSIONS = {
+    'JPEG': 'jpg',
+    'WEBP': 'webp',
+}
+
+
+def variant_name(original_name, digest, variant):
+    """`store/images/shoe.png` -> `store/images/shoe.<digest>.thumbnail.jpg`"""
+    root, _ = os.path.splitext(original_name)
+    size, image_format, crop = VARIANTS[variant]
+    return f'{root}.{digest}.{variant}.{EXTENSIONS[image_format]}'
+
+
+def render_variant(image, variant):
+    size, image_format, crop = VARIANTS[variant]
+    if crop:
+        resized = ImageOps.fit(image, (size, size))
+    else:
+        resized = image.copy()
+        resized.thumbnail((size, size))
+
+    if image_format == 'JPEG' and resized.mode not in ('RGB', 'L'):
+        resized = resized.convert('RGB')
+
+    output = io.BytesIO()
+    resized.save(output, format=image_format, quality=85)
+    return output.getvalue()
+
+
+def generate_variants(field_file):
+    """
+    Render every variant of an uploaded image next to the original and return
+    `{variant: storage name}`. Names carry a hash of the original's content, so
+    re-running for the same upload reuses the files already stored.
+    """
+    storage = field_file.storage
+    with field_file.open('rb') as file:
+        content = file.read()
+
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(content)))
+
+    variants = {}
+    for variant in VARIANTS:
+        name = variant_name(field_file.name, digest, variant)
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(render_variant(image, variant)))
+        variants[variant] = name
+
+    return variants
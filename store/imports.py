@@ -0,0 +1,122 @@
+import codecs
+import csv
+import json
+from collections import Counter
+
+from django.db import transaction
+from rest_framework import serializers
+
+from store import caching
+from store.counters import adjust_products_count
+from store.models import Collection, Product
+
+IMPORT_BATCH_SIZE = 1000
+
+UPDATE_FIELDS = ['title', 'description', 'unit_price', 'inventory', 'collection', 'last_update']
+
+
+class ProductImportSerializer(serializers.ModelSerializer):
+    """
+    Validates one import row without touching the database; the collection and
+    slug checks are done for the whole batch in `import_products`.
+    """
+    collection_id = serializers.IntegerField()
+
+    class Meta:
+        model = Product
+        fields = ['title', 'slug', 'description', 'unit_price', 'inventory', 'collection_id']
+        extra_kwargs = {'slug': {'validators': []}}
+
+
+def read_csv(lines):
+    yield from csv.DictReader(lines)
+
+
+def read_ndjson(lines):
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Handed to the serializer, which reports it as an invalid row.
+            yield None
+
+
+READERS = {
+    'csv': read_csv,
+    'ndjson': read_ndjson,
+}
+
+
+def read_rows(stream, input_format):
+    """Read dict rows from a binary stream of CSV or NDJSON lines."""
+    return READERS[input_format](codecs.iterdecode(stream, 'utf-8'))
+
+
+def import_products(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Upsert products by slug, `batch_size` rows per INSERT ... ON CONFLICT.
+    Invalid rows are reported in the result and never abort the rest of the batch.
+    """
+    result = {'created': 0, 'updated': 0, 'errors': []}
+
+    batch = []
+    for number, row in enumerate(rows, start=1):
+        batch.append((number, row))
+        if len(batch) == batch_size:
+            _import_batch(batch, result)
+            batch = []
+
+    if batch:
+        _import_batch(batch, result)
+
+    return result
+
+
+def _import_batch(batch, result):
+    valid_rows = []
+    for number, row in batch:
+        serializer = ProductImportSerializer(data=row)
+        if serializer.is_valid():
+            valid_rows.append((number, serializer.validated_data))
+        else:
+            result['errors'].append({'row': number, 'errors': serializer.errors})
+
+    collection_ids = {data['collection_id'] for _, data in valid_rows}
+    existing_collection_ids = set(Collection.objects.filter(pk__in=collection_ids).values_list('pk', flat=True))
+
+    products = {}
+    for number, data in valid_rows:
+        if data['collection_id'] not in existing_collection_ids:
+            result['errors'].append({'row': number, 'errors': {'collection_id': ['No collection with given id was found!']}})
+        elif data['slug'] in products:
+            result['errors'].append({'row': number, 'errors': {'slug': ['Duplicate slug in the same batch.']}})
+        else:
+            products[data['slug']] = Product(**data)
+
+    if not products:
+        return
+
+    previous_collections = dict(Product.objects.filter(slug__in=products).values_list('slug', 'collection_id'))
+
+    with transaction.atomic():
+        Product.objects.bulk_create(
+            products.values(), update_conflicts=True, unique_fields=['slug'], update_fields=UPDATE_FIELDS)
+
+        # bulk_create skips the product signals, so keep products_count in step here.
+        deltas = Counter()
+        for slug, product in products.items():
+            previous_collection_id = previous_collections.get(slug)
+            if previous_collection_id != product.collection_id:
+                deltas[product.collection_id] += 1
+                if previous_collection_id is not None:
+                    deltas[previous_collection_id] -= 1
+
+        for collection_id, delta in deltas.items():
+            adjust_products_count(collection_id, delta)
+
+        caching.invalidate(caching.PRODUCTS, caching.COLLECTIONS)
+
+    result['updated'] += len(previous_collections)
+    result['created'] += len(products) - len(previous_collections)
@@ -0,0 +1,55 @@
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from store import caching
+from store.models import Product
+
+
+class InsufficientStock(Exception):
+    def __init__(self, quantities):
+        super().__init__('Not enough stock to reserve every item.')
+        self.quantities = quantities
+
+
+def reserve_stock(quantities):
+    """
+    Take `{product_id: quantity}` out of inventory with a single conditional
+    UPDATE, which only holds the row locks of these products until the caller's
+    transaction ends. Raises InsufficientStock if any product is short, in which
+    case the caller must roll its transaction back.
+
+    The reserved products' last_update moves with their inventory, so their
+    ETags do too. The anonymous response cache is only dropped when a product
+    sells out, so checkouts don't keep emptying it; until then, cached
+    responses may show inventory up to the cache timeout old.
+    """
+    requested = Case(
+        *[When(pk=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+    reserved = Product.objects.filter(pk__in=quantities, inventory__gte=requested) \
+        .update(inventory=F('inventory') - requested, last_update=timezone.now())
+
+    if reserved != len(quantities):
+        raise InsufficientStock(quantities)
+
+    if Product.objects.filter(pk__in=quantities, inventory=0).exists():
+        caching.invalidate(caching.PRODUCTS)
+
+
+def find_shortages(quantities):
+    """The products in `{product_id: quantity}` that don't have that much in stock."""
+    products = Product.objects.filter(pk__in=quantities).only('id', 'title', 'inventory')
+    available = {product.id: product for product in products}
+
+    shortages = []
+    for product_id, quantity in quantities.items():
+        product = available.get(product_id)
+        if product is None or product.inventory < quantity:
+            shortages.append({
+                'product_id': product_id,
+                'title': product.title if product else None,
+                'requested': quantity,
+                'available': product.inventory if product else 0,
+            })
+    return shortages
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from store.models import Order
+from store.rollups import floor_hour, parse_moment, rebuild_sales
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly and daily sales rollups between --start and --end, one chunk per transaction.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='ISO 8601 date or datetime, defaults to the first order.')
+        parser.add_argument('--end', help='ISO 8601 date or datetime (exclusive), defaults to now.')
+        parser.add_argument('--chunk-hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        try:
+            start = parse_moment(options['start']) if options['start'] else \
+                Order.objects.order_by('placed_at').values_list('placed_at', flat=True).first()
+            end = parse_moment(options['end']) if options['end'] else timezone.now()
+        except ValueError as error:
+            raise CommandError(f'Not a date or datetime: {error}')
+
+        if start is None:
+            self.stdout.write('There are no orders to roll up.')
+            return
+
+        chunk = timedelta(hours=options['chunk_hours'])
+        current, rows = floor_hour(start), 0
+        while current < end:
+            chunk_end = min(current + chunk, end)
+            rows += rebuild_sales(current, chunk_end)
+            self.stdout.write(f'Rolled up orders up to {chunk_end.isoformat()} ({rows} hourly rows).')
+            current = chunk_end
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the sales rollups with {rows} hourly rows.'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from store import caching
+
+
+class Command(BaseCommand):
+    help = 'Print hit/miss counters of the catalog response cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args, **options):
+        for namespace in [caching.PRODUCTS, caching.COLLECTIONS]:
+            stats = caching.get_stats(namespace)
+            total = stats['hits'] + stats['misses']
+            ratio = stats['hits'] / total if total else 0
+            self.stdout.write(f'{namespace}: {stats["hits"]} hits, {stats["misses"]} misses ({ratio:.1%} hit ratio)')
+
+            if options['reset']:
+                caching.reset_stats(namespace)
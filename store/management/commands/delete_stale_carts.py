@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from store.carts import STALE_CART_BATCH_SIZE, delete_stale_carts
+
+
+class Command(BaseCommand):
+    help = 'Delete carts (and their items) created more than --days ago, in small batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.STALE_CART_AGE_DAYS)
+        parser.add_argument('--batch-size', type=int, default=STALE_CART_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to wait between batches.')
+
+    def handle(self, *args, **options):
+        def report(carts, items):
+            self.stdout.write(f'{carts} carts and {items} items deleted so far...')
+
+        carts, items = delete_stale_carts(options['days'], options['batch_size'], options['pause'], progress=report)
+        self.stdout.write(self.style.SUCCESS(f'Deleted {carts} carts and {items} cart items.'))
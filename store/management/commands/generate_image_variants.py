@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from store.models import ProductImage
+from store.tasks import generate_image_variants
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and WebP variants for product images that have none yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate for every image, not just missing ones.')
+        parser.add_argument('--sync', action='store_true', help='Render in this process instead of queueing Celery tasks.')
+
+    def handle(self, *args, **options):
+        queryset = ProductImage.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['all']:
+            queryset = queryset.filter(variants={})
+
+        count = 0
+        for image_id in queryset.values_list('id', flat=True).iterator(chunk_size=1000):
+            if options['sync']:
+                generate_image_variants(image_id)
+            else:
+                generate_image_variants.delay(image_id)
+            count += 1
+
+        action = 'Generated' if options['sync'] else 'Queued'
+        self.stdout.write(self.style.SUCCESS(f'{action} variants for {count} images.'))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store.imports import IMPORT_BATCH_SIZE, READERS, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Create or update products by slug from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=list(READERS), help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        input_format = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if input_format not in READERS:
+            raise CommandError('Cannot tell the file format, pass --format csv or --format ndjson.')
+
+        with open(options['path'], 'rb') as file:
+            result = import_products(read_rows(file, input_format), batch_size=options['batch_size'])
+
+        for error in result['errors']:
+            self.stderr.write(f'Row {error["row"]}: {error["errors"]}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result["created"]} created, {result["updated"]} updated, {len(result["errors"])} rows rejected.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from store.counters import reconcile_products_count
+
+
+class Command(BaseCommand):
+    help = 'Recount the stored products_count of every collection and fix any drift.'
+
+    def handle(self, *args, **options):
+        corrected = reconcile_products_count()
+        self.stdout.write(self.style.SUCCESS(f'Corrected products_count on {corrected} collections.'))
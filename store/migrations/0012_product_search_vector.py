@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:29
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+CREATE_SEARCH_OBJECTS = [
+    """
+    CREATE FUNCTION store_product_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql;
+    """,
+    """
+    CREATE TRIGGER store_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON store_product
+    FOR EACH ROW EXECUTE FUNCTION store_product_search_vector_update();
+    """,
+    "UPDATE store_product SET title = title;",
+    "CREATE INDEX store_product_search_vector_idx ON store_product USING gin (search_vector);",
+    "CREATE INDEX store_product_title_trgm_idx ON store_product USING gin (title gin_trgm_ops);",
+]
+
+DROP_SEARCH_OBJECTS = [
+    "DROP INDEX IF EXISTS store_product_title_trgm_idx;",
+    "DROP INDEX IF EXISTS store_product_search_vector_idx;",
+    "DROP TRIGGER IF EXISTS store_product_search_vector_trigger ON store_product;",
+    "DROP FUNCTION IF EXISTS store_product_search_vector_update();",
+]
+
+
+def run_on_postgresql(statements):
+    # The trigger and GIN indexes only exist on PostgreSQL; SQLite test runs fall
+    # back to SearchFilter's icontains lookups in store.filters.FullTextSearchFilter.
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_collection_productimage_last_update'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(run_on_postgresql(CREATE_SEARCH_OBJECTS), run_on_postgresql(DROP_SEARCH_OBJECTS)),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:34
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_products_count(apps, schema_editor):
+    Collection = apps.get_model('store', 'Collection')
+    Product = apps.get_model('store', 'Product')
+
+    Collection.objects.update(products_count=Coalesce(Subquery(
+        Product.objects.filter(collection=OuterRef('pk'))
+        .order_by()
+        .values('collection')
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0012_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collection',
+            name='products_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_products_count, migrations.RunPython.noop),
+    ]
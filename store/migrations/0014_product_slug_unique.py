@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:31
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def make_slugs_unique(apps, schema_editor):
+    # Bulk imports upsert on slug, so existing duplicates get their id appended.
+    Product = apps.get_model('store', 'Product')
+
+    duplicates = Product.objects.values('slug').annotate(count=Count('id')).filter(count__gt=1)
+    for duplicate in duplicates:
+        for product in Product.objects.filter(slug=duplicate['slug']).order_by('id')[1:]:
+            product.slug = free_slug(Product, product.slug, product.id)
+            product.save(update_fields=['slug'])
+
+
+def free_slug(Product, slug, product_id):
+    # Another product may already be called e.g. 'shoe-12', so keep counting until the slug is free.
+    suffix, attempt = f'-{product_id}', 1
+    while True:
+        candidate = slug[:255 - len(suffix)] + suffix
+        if not Product.objects.filter(slug=candidate).exists():
+            return candidate
+        attempt += 1
+        suffix = f'-{product_id}-{attempt}'
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_collection_products_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(make_slugs_unique, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='product',
+            name='slug',
+            field=models.SlugField(max_length=255, unique=True),
+        ),
+    ]
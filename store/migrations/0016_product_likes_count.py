@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:37
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    Like = apps.get_model('likes', 'Like')
+    Product = apps.get_model('store', 'Product')
+
+    content_type = ContentType.objects.filter(app_label='store', model='product').first()
+    if content_type is None:
+        return
+
+    Product.objects.update(likes_count=Coalesce(Subquery(
+        Like.objects.filter(content_type=content_type, object_id=OuterRef('pk'))
+        .order_by()
+        .values('object_id')
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_productimage_variants'),
+        ('likes', '0003_like_unique_user_object'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='likes_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
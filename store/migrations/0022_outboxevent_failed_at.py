@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:08
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def mark_exhausted_events_failed(apps, schema_editor):
+    # Events that already used up their attempts were skipped by the dispatcher without a trace.
+    apps.get_model('store', 'OutboxEvent').objects \
+        .filter(delivered_at__isnull=True, attempts__gte=10) \
+        .update(failed_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0020_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='store_outbox_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='outboxevent',
+            name='failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_exhausted_events_failed, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(condition=models.Q(('delivered_at__isnull', True), ('failed_at__isnull', True)), fields=['available_at', 'id'], name='store_outbox_pending_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.contrib import admin
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from django.core.validators import MinValueValidator, FileExtensionValidator
 from uuid import uuid4
 
@@ -12,6 +14,9 @@ from store.validators import validate_file_size
 class Collection(models.Model):
     title = models.CharField(max_length=255)
     featured_product = models.ForeignKey('Product', on_delete=models.SET_NULL, null=True, related_name='+')
+    last_update = models.DateTimeField(auto_now=True)
+    # Kept in step by the product signal handlers, see store.counters.
+    products_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
@@ -33,24 +38,37 @@ class Promotion(models.Model):
 
 class Product(models.Model):
     title = models.CharField(max_length=255)
-    slug = models.SlugField(max_length=255)
+    slug = models.SlugField(max_length=255, unique=True)
     description = models.TextField(null=True, blank=True)
     unit_price = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(1)])
     inventory = models.IntegerField(validators=[MinValueValidator(0)])
     last_update = models.DateTimeField(auto_now=True)
     collection = models.ForeignKey(Collection, on_delete=models.PROTECT, related_name='products')
     promotions = models.ManyToManyField(Promotion, blank=True)
+    # Buffered in the cache and flushed periodically, see likes.counters.
+    likes_count = models.IntegerField(default=0, editable=False)
+
+    # Maintained by a database trigger on PostgreSQL, see migration 0012.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     def __str__(self):
         return self.title
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['title', 'id']),
+            models.Index(fields=['unit_price', 'id']),
+            models.Index(fields=['last_update', 'id']),
+        ]
 
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='store/images', null=True, blank=True, validators=[validate_file_size])
+    last_update = models.DateTimeField(auto_now=True)
+    # {variant: storage name}, filled in by store.tasks.generate_image_variants.
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
 
 
@@ -119,6 +137,9 @@ class Order(models.Model):
         permissions = [
             ('cancel_order', 'Can cancel order'),
         ]
+        indexes = [
+            models.Index(fields=['placed_at', 'id']),
+        ]
 
 
 class OrderItem(models.Model):
@@ -143,6 +164,10 @@ class Cart(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Lets store.tasks.delete_stale_carts find old carts without a full scan.
+            models.Index(fields=['created_at']),
+        ]
 
 
 class CartItem(models.Model):
@@ -162,4 +187,75 @@ class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
     name = models.CharField(max_length=255)
     description = models.TextField()
-    date = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'date', 'id']),
+        ]
+
+class Watermark(models.Model):
+    """How far an incremental job has got, e.g. the placed_at the sales rollups reached, in epoch seconds."""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    last_update = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} - {self.position}'
+
+
+class OutboxEvent(models.Model):
+    """An event written in the transaction that caused it, delivered by store.outbox.dispatch."""
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Not delivered before this, pushed back after every failed attempt.
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    # Set once the event ran out of attempts; it's only retried by hand after that.
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.topic} - {self.payload}'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at', 'id'],
+                         condition=models.Q(delivered_at__isnull=True, failed_at__isnull=True),
+                         name='store_outbox_pending_idx'),
+        ]
+
+
+class SalesRollup(models.Model):
+    """
+    Orders, units and revenue per period and payment status, filled in by
+    store.rollups.rebuild_sales. Rows with a product break sales down by
+    product; rows with only a collection are that collection's totals, and rows
+    with neither are the totals of all orders, so order counts are exact at
+    every level.
+    """
+    period = models.DateTimeField()
+    payment_status = models.CharField(max_length=1, choices=Order.PAYMENT_CHOICES)
+    collection = models.ForeignKey(Collection, on_delete=models.CASCADE, null=True, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, related_name='+')
+    orders = models.PositiveIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=['period', 'payment_status']),
+        ]
+
+
+class HourlySales(SalesRollup):
+    class Meta(SalesRollup.Meta):
+        verbose_name_plural = 'hourly sales'
+
+
+class DailySales(SalesRollup):
+    class Meta(SalesRollup.Meta):
+        verbose_name_plural = 'daily sales'
@@ -0,0 +1,120 @@
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from store.models import Order, OutboxEvent
+from store.signals import order_created, payment_status_changed
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_BATCH_SIZE = 100
+MAX_ATTEMPTS = 10
+MAX_BACKOFF = timedelta(hours=1)
+
+
+def _order_created(payload):
+    return {'order': Order.objects.get(pk=payload['order_id'])}
+
+
+def _payment_status_changed(payload):
+    return {'changes': payload['changes']}
+
+
+# topic: (signal, builds the signal's keyword arguments from the payload)
+TOPICS = {
+    'order_created': (order_created, _order_created),
+    'payment_status_changed': (payment_status_changed, _payment_status_changed),
+}
+
+
+def publish(topic, **payload):
+    """
+    Record an event in the current transaction, so it's delivered if and only
+    if the transaction commits. A dispatch is kicked off after the commit; the
+    periodic dispatcher picks the event up if that doesn't happen.
+    """
+    # Imported here because store.tasks imports this module.
+    from store.tasks import dispatch_outbox
+
+    OutboxEvent.objects.create(topic=topic, payload=payload)
+    transaction.on_commit(dispatch_outbox.delay, robust=True)
+
+
+def dispatch(batch_size=DISPATCH_BATCH_SIZE):
+    """
+    Deliver up to `batch_size` due events to their signal's receivers. An event
+    that any receiver fails on is retried later with exponential backoff, so
+    receivers see each event at least once and must tolerate repeats; after
+    MAX_ATTEMPTS it's marked failed and left for someone to look at. Returns
+    the number of events delivered.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets several dispatchers share the backlog.
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(delivered_at__isnull=True, failed_at__isnull=True, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+
+        delivered = 0
+        for event in events:
+            # A receiver's failed query must not take the other events down with it.
+            savepoint = transaction.savepoint()
+            error = _deliver(event)
+            if error is None:
+                transaction.savepoint_commit(savepoint)
+                event.delivered_at = timezone.now()
+                delivered += 1
+            else:
+                transaction.savepoint_rollback(savepoint)
+                event.attempts += 1
+                event.available_at = timezone.now() + min(timedelta(seconds=10 * 2 ** event.attempts), MAX_BACKOFF)
+                event.last_error = error
+                if event.attempts >= MAX_ATTEMPTS:
+                    event.failed_at = timezone.now()
+                    logger.error('Giving up on outbox event %s (%s) after %s attempts: %s',
+                                 event.pk, event.topic, event.attempts, error)
+                else:
+                    logger.warning('Delivering outbox event %s (%s) failed: %s', event.pk, event.topic, error)
+
+        OutboxEvent.objects.bulk_update(
+            events, ['delivered_at', 'attempts', 'available_at', 'last_error', 'failed_at'])
+
+    return delivered
+
+
+def _deliver(event):
+    """Send the event to its receivers and return the first error, if any."""
+    if event.topic not in TOPICS:
+        return f'Unknown topic {event.topic!r}.'
+
+    signal, build_kwargs = TOPICS[event.topic]
+    try:
+        kwargs = build_kwargs(event.payload)
+    except Exception as error:
+        return repr(error)
+
+    for receiver, response in signal.send_robust(OutboxEvent, **kwargs):
+        if isinstance(response, Exception):
+            return f'{receiver.__module__}.{receiver.__qualname__}: {response!r}'
+    return None
+
+
+def purge_delivered(older_than_days=7, batch_size=1000):
+    """Delete events delivered more than `older_than_days` ago, in batches. Returns how many."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    total = 0
+    while True:
+        batch = list(OutboxEvent.objects.filter(delivered_at__lt=cutoff).values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return total
+        total += OutboxEvent.objects.filter(pk__in=batch).delete()[0]
+
+
+def retry_failed(events):
+    """Put failed `events` (a queryset) back in line for delivery. Returns how many."""
+    return events.filter(delivered_at__isnull=True, failed_at__isnull=False) \
+        .update(failed_at=None, attempts=0, available_at=timezone.now(), last_error='')
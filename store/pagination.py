@@ -1,4 +1,181 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over a composite, unique ordering.
+
+    DRF's CursorPagination only keys on the first ordering field and falls back to
+    OFFSET for ties. Here the cursor stores the value of every ordering field and
+    a primary key tie-breaker is always appended, so each page is a single indexed
+    range scan (`WHERE (a, pk) > (x, y) ORDER BY a, pk LIMIT n`) no matter how deep.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = None
+    tie_breaker = 'pk'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (reverse, self.current_position) = (False, None)
+        else:
+            (reverse, self.current_position) = (self.cursor.reverse, self.decode_position(self.cursor.position))
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+
+        if self.current_position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, self.current_position))
+
+        # Always fetch an extra row to find out whether there is a following page.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following_page = len(results) > len(self.page)
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = self.current_position is not None
+            self.has_previous = has_following_page
+        else:
+            self.has_next = has_following_page
+            self.has_previous = self.current_position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        for backend in getattr(view, 'filter_backends', []):
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(request, queryset, view)
+                break
+
+        ordering = list(ordering or getattr(view, 'ordering', None) or self.ordering or [])
+        assert not any('__' in field for field in ordering), (
+            'Keyset pagination does not support double underscore lookups for orderings.'
+        )
+
+        fields = [field.lstrip('-') for field in ordering]
+        if self.tie_breaker not in fields and 'id' not in fields:
+            descending = bool(ordering) and ordering[0].startswith('-')
+            ordering.append(f'-{self.tie_breaker}' if descending else self.tie_breaker)
+
+        return tuple(ordering)
+
+    def get_keyset_filter(self, ordering, position):
+        """
+        Build `(a > x) OR (a = x AND b > y) OR ...` for the given ordering, flipping
+        the comparison for descending fields.
+        """
+        conditions = []
+        equal_so_far = Q()
+        for order, value in zip(ordering, position):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') else 'gt'
+            conditions.append(equal_so_far & Q(**{f'{field}__{lookup}': value}))
+            equal_so_far &= Q(**{field: value})
+
+        return reduce(operator.or_, conditions)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+
+        position = self._get_position_from_instance(self.page[-1], self.ordering) if self.page \
+            else self.encode_position(self.current_position)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+
+        position = self._get_position_from_instance(self.page[0], self.ordering) if self.page \
+            else self.encode_position(self.current_position)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = order.lstrip('-')
+            values.append(instance[field] if isinstance(instance, dict) else getattr(instance, field))
+
+        return self.encode_position(values)
+
+    def encode_position(self, values):
+        return json.dumps([str(value) for value in values])
+
+    def decode_position(self, position):
+        if position is None:
+            return None
+
+        try:
+            values = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
 
 class DefaultPagination(PageNumberPagination):
-    page_size = 10
\ No newline at end of file
+    """
+    Page number pagination by default; `?pagination=cursor` switches the request
+    to keyset pagination so deep pages skip the COUNT(*) and OFFSET entirely.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.mode_query_param) == 'cursor':
+            self.keyset = self.keyset_class()
+            page = self.keyset.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.keyset.display_page_controls
+            return page
+
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
+
+
+class OptionalPagination(DefaultPagination):
+    """
+    Unpaginated unless the client opts in with `?pagination=cursor`, for nested
+    lists whose response shape must stay a plain array.
+    """
+    page_size = None
+    page_size_query_param = None
+
+
+def _reverse_ordering(ordering):
+    return tuple(order[1:] if order.startswith('-') else f'-{order}' for order in ordering)
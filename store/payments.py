@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from store import outbox
+from store.models import Order
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+NOT_FOUND = 'not_found'
+NOT_ALLOWED = 'not_allowed'
+
+# current payment status: the statuses it may move to
+ALLOWED_TRANSITIONS = {
+    Order.PAYMENT_STATUS_PENDING: {Order.PAYMENT_STATUS_COMPLETE, Order.PAYMENT_STATUS_FAILED},
+    Order.PAYMENT_STATUS_FAILED: {Order.PAYMENT_STATUS_PENDING, Order.PAYMENT_STATUS_COMPLETE},
+    Order.PAYMENT_STATUS_COMPLETE: set(),
+}
+
+
+def transition_payment_statuses(statuses):
+    """
+    Move the orders in `{order_id: payment_status}` to their new status with one
+    UPDATE per target status, and return `{order_id: outcome}`. Orders that are
+    already in that status are left alone, and moves ALLOWED_TRANSITIONS doesn't
+    list are refused. The changes are published as a single
+    payment_status_changed event.
+    """
+    # Imported here because store.tasks imports store.outbox.
+    from store.tasks import refresh_sales_reports
+
+    with transaction.atomic():
+        # Locked so no other transition slips in between reading and updating.
+        current = {
+            order_id: (payment_status, placed_at)
+            for order_id, payment_status, placed_at in Order.objects.select_for_update()
+            .filter(pk__in=statuses).values_list('id', 'payment_status', 'placed_at')
+        }
+
+        outcomes = {}
+        targets = defaultdict(list)
+        for order_id, target in statuses.items():
+            if order_id not in current:
+                outcomes[order_id] = NOT_FOUND
+            elif current[order_id][0] == target:
+                outcomes[order_id] = UNCHANGED
+            elif target not in ALLOWED_TRANSITIONS[current[order_id][0]]:
+                outcomes[order_id] = NOT_ALLOWED
+            else:
+                outcomes[order_id] = UPDATED
+                targets[target].append(order_id)
+
+        for target, order_ids in targets.items():
+            Order.objects.filter(pk__in=order_ids).update(payment_status=target)
+
+        changes = [
+            {'order_id': order_id, 'from': current[order_id][0], 'to': target}
+            for target, order_ids in targets.items() for order_id in order_ids
+        ]
+        if changes:
+            outbox.publish('payment_status_changed', changes=changes)
+            # QuerySet.update() doesn't send post_save, which refreshes single orders.
+            placed_at = sorted({current[change['order_id']][1].isoformat() for change in changes})
+            transaction.on_commit(lambda: refresh_sales_reports.delay(placed_at), robust=True)
+
+    return outcomes
@@ -0,0 +1,69 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import DecimalField, ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from store.models import Promotion
+
+TAX_RATE = Decimal('1.1')
+CENT = Decimal('0.01')
+
+PRICE = DecimalField(max_digits=14, decimal_places=2)
+
+
+def annotate_best_discount(queryset):
+    """
+    Annotate each product with `best_discount`, the largest discount among its
+    promotions, as a correlated subquery evaluated only for the rows returned.
+    """
+    best = Promotion.objects.filter(product=OuterRef('pk')).order_by('-discount').values('discount')[:1]
+    return queryset.annotate(best_discount=Subquery(best))
+
+
+def get_best_discount(product):
+    """Use the annotation when the queryset has it, otherwise look it up."""
+    if not hasattr(product, 'best_discount'):
+        product.best_discount = product.promotions.order_by('-discount').values_list('discount', flat=True).first()
+    return product.best_discount
+
+
+def discounted_price(unit_price, discount):
+    """`discount` is a percentage; anything outside 0-100 is clamped."""
+    if not discount:
+        return unit_price
+
+    percentage = min(max(Decimal(str(discount)), Decimal(0)), Decimal(100))
+    return (unit_price * (100 - percentage) / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def with_tax(price):
+    return (price * TAX_RATE).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def line_total(quantity='quantity', unit_price='unit_price'):
+    return ExpressionWrapper(F(quantity) * F(unit_price), output_field=PRICE)
+
+
+def annotate_line_totals(queryset, unit_price='unit_price'):
+    """Annotate cart or order items with `total_price`, `unit_price` being the path to their price."""
+    return queryset.annotate(total_price=line_total(unit_price=unit_price))
+
+
+def annotate_cart_totals(queryset):
+    """Annotate carts with `total_price`, summed in the database over their items."""
+    return queryset.annotate(total_price=_sum(line_total('items__quantity', 'items__product__unit_price')))
+
+
+def annotate_order_totals(queryset):
+    """Annotate orders with `total_price`, summed in the database over their items."""
+    return queryset.annotate(total_price=_sum(line_total('items__quantity', 'items__unit_price')))
+
+
+def get_total(instance, compute):
+    """The `total_price` annotation when the queryset has it, otherwise `compute()`."""
+    total = getattr(instance, 'total_price', None)
+    return compute() if total is None else total
+
+
+def _sum(expression):
+    return Coalesce(Sum(expression), Value(Decimal(0)), output_field=PRICE)
@@ -0,0 +1,179 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, Window
+from django.db.models.functions import RowNumber, TruncDay, TruncHour
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from store.models import DailySales, HourlySales, Order, OrderItem, Watermark
+from store.pricing import line_total
+
+# Orders newer than this are left for the next run, so orders still being
+# committed can't slip in behind the watermark.
+ROLLUP_DELAY = timedelta(minutes=1)
+
+SALES = 'sales_rollups'
+SALES_CHUNK = timedelta(days=1)
+SALES_MAX_CHUNKS_PER_RUN = 7
+HOUR = timedelta(hours=1)
+
+
+def top_sellers(days=30, limit=10, collection_id=None):
+    """
+    The `limit` best selling products of each collection over the last `days`
+    days, read from the per product DailySales rows, ordered by collection and
+    rank. Orders whose payment failed aren't counted.
+    """
+    since = floor_day(timezone.now()) - timedelta(days=days - 1)
+    sales = DailySales.objects.filter(period__gte=since, product__isnull=False) \
+        .exclude(payment_status=Order.PAYMENT_STATUS_FAILED)
+    if collection_id is not None:
+        sales = sales.filter(product__collection_id=collection_id)
+
+    return sales \
+        .order_by() \
+        .values('product_id', 'product__title', 'product__unit_price', 'product__collection_id') \
+        .annotate(units_sold=Sum('units')) \
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=F('product__collection_id'),
+            order_by=[F('units_sold').desc(), F('product_id')],
+        )) \
+        .filter(rank__lte=limit) \
+        .order_by('product__collection_id', 'rank')
+
+
+def parse_moment(value):
+    """An ISO 8601 date or datetime as an aware datetime; raises ValueError otherwise."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(value)
+        moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def floor_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(moment):
+    return timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Each rollup row carries one of these sets of dimensions besides period and payment status.
+SALES_LEVELS = [
+    ['product_id', 'product__collection_id'],
+    ['product__collection_id'],
+    [],
+]
+
+
+def rebuild_sales(start, end):
+    """
+    Recompute HourlySales for the hours from `start` up to `end` straight from
+    the orders, then DailySales for the days those hours fall in. Returns the
+    number of hourly rows written.
+    """
+    start = floor_hour(start)
+    end = floor_hour(end) if end == floor_hour(end) else floor_hour(end) + HOUR
+
+    lines = OrderItem.objects.filter(order__placed_at__gte=start, order__placed_at__lt=end).order_by()
+    hourly = []
+    for dimensions in SALES_LEVELS:
+        grouped = lines \
+            .values(*dimensions, hour=TruncHour('order__placed_at'), status=F('order__payment_status')) \
+            .annotate(
+                order_count=Count('order', distinct=True),
+                units_sold=Sum('quantity'),
+                revenue_sold=Sum(line_total()),
+            )
+        for row in grouped:
+            hourly.append(HourlySales(
+                period=row['hour'],
+                payment_status=row['status'],
+                product_id=row.get('product_id'),
+                collection_id=row.get('product__collection_id'),
+                orders=row['order_count'],
+                units=row['units_sold'],
+                revenue=row['revenue_sold'],
+            ))
+
+    day_start, day_end = floor_day(start), floor_day(end - HOUR) + timedelta(days=1)
+
+    with transaction.atomic():
+        HourlySales.objects.filter(period__gte=start, period__lt=end).delete()
+        HourlySales.objects.bulk_create(hourly, batch_size=1000)
+
+        # Days are sums of their hours; each order falls in exactly one hour.
+        DailySales.objects.filter(period__gte=day_start, period__lt=day_end).delete()
+        daily = HourlySales.objects.filter(period__gte=day_start, period__lt=day_end) \
+            .order_by() \
+            .values('payment_status', 'product_id', 'collection_id', day=TruncDay('period')) \
+            .annotate(order_count=Sum('orders'), units_sold=Sum('units'), revenue_sold=Sum('revenue'))
+        DailySales.objects.bulk_create([
+            DailySales(
+                period=row['day'],
+                payment_status=row['payment_status'],
+                product_id=row['product_id'],
+                collection_id=row['collection_id'],
+                orders=row['order_count'],
+                units=row['units_sold'],
+                revenue=row['revenue_sold'],
+            )
+            for row in daily
+        ], batch_size=1000)
+
+    return len(hourly)
+
+
+def _watermark_time(watermark):
+    return datetime.fromtimestamp(watermark.position, tz=dt_timezone.utc)
+
+
+def rollup_sales(max_chunks=SALES_MAX_CHUNKS_PER_RUN):
+    """
+    Roll the hours of orders placed since the `Order.placed_at` high-water mark
+    into the sales rollups, a day of orders per transaction and at most
+    `max_chunks` days per run. Returns the number of hours rolled up.
+    """
+    cutoff = floor_hour(timezone.now() - ROLLUP_DELAY)
+    hours = 0
+    for _ in range(max_chunks):
+        with transaction.atomic():
+            watermark, _ = Watermark.objects.select_for_update().get_or_create(name=SALES)
+            if watermark.position:
+                start = _watermark_time(watermark)
+            else:
+                first = Order.objects.order_by('placed_at').values_list('placed_at', flat=True).first()
+                start = floor_hour(first) if first else cutoff
+
+            end = min(start + SALES_CHUNK, cutoff)
+            if start >= end:
+                break
+
+            rebuild_sales(start, end)
+            watermark.position = int(end.timestamp())
+            watermark.save()
+            hours += int((end - start) / HOUR)
+
+    return hours
+
+
+def refresh_sales(moments):
+    """
+    Rebuild the rolled up hours containing `moments`, e.g. the placed_at of
+    orders whose payment status changed. Hours past the high-water mark are
+    left to rollup_sales.
+    """
+    watermark = Watermark.objects.filter(name=SALES).first()
+    if watermark is None:
+        return 0
+
+    rolled_up_until = _watermark_time(watermark)
+    hours = sorted({floor_hour(moment) for moment in moments if moment < rolled_up_until})
+    for hour in hours:
+        rebuild_sales(hour, hour + HOUR)
+    return len(hours)
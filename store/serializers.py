@@ -1,14 +1,19 @@
-from decimal import Decimal
-
-from django.db import transaction
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
 
 from rest_framework import serializers
 
-from store.signals import order_created
+from store import outbox
+from store.carts import get_cart_storage, merge_quantities
+from store.fieldsets import SparseFieldsetMixin
+from store.inventory import reserve_stock
+from store.rollups import parse_moment
+from store.pricing import get_best_discount, get_total, discounted_price, with_tax
 from store.models import Product, Collection, Review, Cart, CartItem, Customer, Order, OrderItem, ProductImage
+from tags.models import TaggedItem
 
 
-class CollectionSerializer(serializers.ModelSerializer):
+class CollectionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Collection
         fields = ['id', 'title', 'products_count']
@@ -25,24 +30,61 @@ class CollectionSerializer(serializers.ModelSerializer):
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'variants']
+
+    variants = serializers.SerializerMethodField(method_name='get_variants')
+
+    def get_variants(self, product_image: ProductImage):
+        request = self.context.get('request')
+        urls = {}
+        for variant, name in product_image.variants.items():
+            url = product_image.image.storage.url(name)
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls
 
     def create(self, validated_data):
         product_id = self.context['product_id']
         return ProductImage.objects.create(product_id=product_id, **validated_data)
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        products = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+
+        # Resolve the tags of the whole page in one query instead of one per product.
+        if 'tags' in self.child.fields:
+            tags = TaggedItem.objects.get_tags_for_objects(products)
+            content_type_id = ContentType.objects.get_for_model(Product).id
+            for product in products:
+                product.tag_list = tags.get((content_type_id, product.pk), [])
+
+        return super().to_representation(products)
+
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
-        fields = ['id', 'title', 'description', 'slug', 'inventory', 'unit_price', 'price_with_tax', 'collection', 'images']
+        fields = ['id', 'title', 'description', 'slug', 'inventory', 'unit_price', 'discounted_price', 'price_with_tax',
+                  'collection', 'images', 'likes_count', 'tags']
+        optional_fields = ['tags']
+        list_serializer_class = ProductListSerializer
 
     images = ProductImageSerializer(many=True, read_only=True)
+    tags = serializers.SerializerMethodField(method_name='get_tags')
+
+    def get_tags(self, product: Product):
+        if not hasattr(product, 'tag_list'):
+            product.tag_list = [tagged_item.tag for tagged_item in TaggedItem.objects.get_tags_for(Product, product.pk)]
+        return [tag.label for tag in product.tag_list]
 
+    discounted_price = serializers.SerializerMethodField(method_name='get_discounted_price')
     price_with_tax = serializers.SerializerMethodField(method_name='get_price_with_tax')
 
+    def get_discounted_price(self, product: Product):
+        return discounted_price(product.unit_price, get_best_discount(product))
+
     def get_price_with_tax(self, product: Product):
-        return product.unit_price * Decimal(1.1)
+        return with_tax(self.get_discounted_price(product))
 
     # id = serializers.IntegerField()
     # title = serializers.CharField(max_length=255)
@@ -78,7 +120,7 @@ class CartItemSerializer(serializers.ModelSerializer):
     total_price = serializers.SerializerMethodField(method_name='get_total_price')
 
     def get_total_price(self, cart_item: CartItem):
-        return cart_item.quantity * cart_item.product.unit_price
+        return get_total(cart_item, lambda: cart_item.quantity * cart_item.product.unit_price)
 
 
 class CartSerializer(serializers.ModelSerializer):
@@ -91,39 +133,42 @@ class CartSerializer(serializers.ModelSerializer):
     total_price = serializers.SerializerMethodField(method_name='get_total_price')
 
     def get_total_price(self, cart: Cart):
-        total_price = 0
-        for item in cart.items.all():
-            total_price += item.quantity * item.product.unit_price
+        return get_total(cart, lambda: sum(item.quantity * item.product.unit_price for item in cart.items.all()))
+
 
-        return total_price
+class AddCartItemListSerializer(serializers.ListSerializer):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('allow_empty', False)
+        super().__init__(*args, **kwargs)
+
+    def save(self):
+        self.instance = _add_cart_items(self.context['cart_id'], self.validated_data)
+        return self.instance
 
 
 class AddCartItemSerializer(serializers.ModelSerializer):
     product_id = serializers.IntegerField()
 
-    def validate_product_id(self, value):
-        if not Product.objects.filter(pk=value).exists():
-            raise serializers.ValidationError('No product with given id was found!')
-        return value
-
     def save(self):
-        product_id = self.validated_data['product_id']
-        quantity = self.validated_data['quantity']
-        cart_id = self.context['cart_id']
-
-        try:
-            cart_item = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-            cart_item.quantity += quantity
-            cart_item.save()
-            self.instance = cart_item
-        except CartItem.DoesNotExist:
-            self.instance = CartItem.objects.create(cart_id=cart_id, product_id=product_id, quantity=quantity) # or **self.validated_data
-
+        self.instance = _add_cart_items(self.context['cart_id'], [self.validated_data])[0]
         return self.instance
 
     class Meta:
         model = CartItem
         fields = ['id', 'product_id', 'quantity']
+        list_serializer_class = AddCartItemListSerializer
+
+
+def _add_cart_items(cart_id, items):
+    # A missing product is only found out by the upsert, which then gets rolled back.
+    with transaction.atomic():
+        cart_items, missing = get_cart_storage().add_items(cart_id, merge_quantities(items))
+        if len(items) == 1 and missing:
+            raise serializers.ValidationError({'product_id': ['No product with given id was found!']})
+        if missing:
+            raise serializers.ValidationError(
+                {'product_id': [f'No product with id {product_id} was found!' for product_id in missing]})
+    return cart_items
 
 
 class UpdateCartItemSerializer(serializers.ModelSerializer):
@@ -160,10 +205,10 @@ class OrderItemSerializer(serializers.ModelSerializer):
     total_price = serializers.SerializerMethodField(method_name='get_total_price')
 
     def get_total_price(self, order_item: OrderItem):
-        return order_item.quantity * order_item.unit_price
+        return get_total(order_item, lambda: order_item.quantity * order_item.unit_price)
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['id', 'customer_id', 'placed_at', 'payment_status', 'items', 'total_price']
@@ -172,49 +217,105 @@ class OrderSerializer(serializers.ModelSerializer):
     total_price = serializers.SerializerMethodField(method_name='get_total_price')
 
     def get_total_price(self, order: Order):
-        total_price = 0
-        for item in order.items.all():
-            total_price += item.quantity * item.unit_price
-
-        return total_price
+        return get_total(order, lambda: sum(item.quantity * item.unit_price for item in order.items.all()))
 
 class UpdateOrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['payment_status']
 
+
+class PaymentStatusTransitionSerializer(serializers.Serializer):
+    order_id = serializers.IntegerField()
+    payment_status = serializers.ChoiceField(choices=Order.PAYMENT_CHOICES)
+
+
+class BulkUpdateOrderSerializer(serializers.Serializer):
+    transitions = PaymentStatusTransitionSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def validate_transitions(self, transitions):
+        statuses = {}
+        for transition in transitions:
+            order_id = transition['order_id']
+            if statuses.setdefault(order_id, transition['payment_status']) != transition['payment_status']:
+                raise serializers.ValidationError(f'Order {order_id} is given more than one payment status.')
+        return statuses
+
 class CreateOrderSerializer(serializers.Serializer):
     cart_id = serializers.UUIDField()
 
     def validate_cart_id(self, cart_id):
-        if not Cart.objects.filter(pk=cart_id).exists():
+        item_count = get_cart_storage().count_items(cart_id)
+        if item_count is None:
             raise serializers.ValidationError('No cart with given id was found!')
-        elif CartItem.objects.filter(cart_id=cart_id).count() < 1:
+        elif item_count < 1:
             raise serializers.ValidationError('The cart is empty!')
         return cart_id
 
     def save(self, **kwargs):
-        with transaction.atomic():
-            cart_id = self.validated_data['cart_id']
-            user_id = self.context.get('user_id')
+        cart_id = self.validated_data['cart_id']
+        storage = get_cart_storage()
+        try:
+            with transaction.atomic():
+                # Carts kept in the cache are written to the database to check them out.
+                storage.write(cart_id)
+                return self._place_order(cart_id)
+        except Exception:
+            storage.restore(cart_id)
+            raise
+
+    def _place_order(self, cart_id):
+        cart_items = list(CartItem.objects.select_related('product').filter(cart_id=cart_id))
+        reserve_stock({item.product_id: item.quantity for item in cart_items})
+
+        order = Order.objects.create(customer_id=self.context['customer_id'])
 
-            customer = Customer.objects.get(user_id=user_id)
+        order_items = []
+        for item in cart_items:
+            order_items.append(
+                OrderItem(order=order, product=item.product, unit_price=item.product.unit_price, quantity=item.quantity)
+            )
 
-            order = Order.objects.create(customer=customer)
+        OrderItem.objects.bulk_create(order_items)
 
-            cart_items = CartItem.objects.select_related('product').filter(cart_id=cart_id)
+        Cart.objects.filter(pk=cart_id).delete()
 
-            order_items = []
-            for item in cart_items:
-                order_items.append(
-                    OrderItem(order=order, product=item.product, unit_price=item.product.unit_price, quantity=item.quantity)
-                )
+        # Delivered to the order_created receivers by store.outbox.dispatch after the commit.
+        outbox.publish('order_created', order_id=order.id)
 
-            OrderItem.objects.bulk_create(order_items)
+        return order
 
-            Cart.objects.filter(pk=cart_id).delete()
 
-            order_created.send_robust(self.__class__, order=order)
 
-            return order
+class SalesReportSerializer(serializers.Serializer):
+    period = serializers.DateTimeField()
+    payment_status = serializers.CharField()
+    collection_id = serializers.IntegerField(required=False)
+    product_id = serializers.IntegerField(required=False)
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
 
+
+class MomentField(serializers.Field):
+    """An ISO 8601 date or datetime, read as an aware datetime."""
+    default_error_messages = {'invalid': 'Enter an ISO 8601 date or datetime.'}
+
+    def to_internal_value(self, data):
+        try:
+            return parse_moment(str(data))
+        except ValueError:
+            self.fail('invalid')
+
+    def to_representation(self, value):
+        return value.isoformat()
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    start = MomentField(required=False)
+    end = MomentField(required=False)
+    granularity = serializers.ChoiceField(choices=['hour', 'day'], default='day')
+    group_by = serializers.ChoiceField(choices=['payment_status', 'collection', 'product'], default='payment_status')
+    payment_status = serializers.ChoiceField(choices=Order.PAYMENT_CHOICES, required=False)
+    collection_id = serializers.IntegerField(required=False)
+    product_id = serializers.IntegerField(required=False)
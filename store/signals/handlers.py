@@ -1,9 +1,147 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.conf import settings
-from store.models import Customer
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from likes.signals import likes_flushed
+from store import caching
+from store.counters import adjust_products_count
+from store.models import Customer, Order, Product, ProductImage, Collection, Promotion
+from store.tasks import generate_image_variants, refresh_sales_reports
+from tags.models import Tag, TaggedItem
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_customer_for_new_user(sender, **kwargs):
     if kwargs['created']:
-        Customer.objects.create(user=kwargs['instance'])
\ No newline at end of file
+        Customer.objects.create(user=kwargs['instance'])
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_collection(sender, **kwargs):
+    instance = kwargs['instance']
+    if instance._state.adding:
+        instance._previous_collection_id = None
+    else:
+        instance._previous_collection_id = Product.objects.filter(pk=instance.pk) \
+            .values_list('collection_id', flat=True).first()
+
+
+@receiver(post_save, sender=Product)
+def update_products_count_on_save(sender, **kwargs):
+    instance = kwargs['instance']
+    previous_collection_id = getattr(instance, '_previous_collection_id', None)
+
+    if kwargs['created']:
+        adjust_products_count(instance.collection_id, 1)
+    elif previous_collection_id != instance.collection_id:
+        adjust_products_count(previous_collection_id, -1)
+        adjust_products_count(instance.collection_id, 1)
+
+
+@receiver(post_delete, sender=Product)
+def update_products_count_on_delete(sender, **kwargs):
+    adjust_products_count(kwargs['instance'].collection_id, -1)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_product_cache(sender, **kwargs):
+    # Collections carry products_count, so they go stale with every product.
+    caching.invalidate(caching.PRODUCTS, caching.COLLECTIONS)
+
+
+@receiver(post_save, sender=ProductImage)
+def schedule_image_variants(sender, **kwargs):
+    instance = kwargs['instance']
+    if instance.image:
+        transaction.on_commit(lambda: generate_image_variants.delay(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def touch_product_of_image(sender, **kwargs):
+    # Images are part of the product representation, so they move its Last-Modified.
+    Product.objects.filter(pk=kwargs['instance'].product_id).update(last_update=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=Promotion)
+def invalidate_product_details_cache(sender, **kwargs):
+    caching.invalidate(caching.PRODUCTS)
+
+
+@receiver(post_save, sender=Promotion)
+@receiver(pre_delete, sender=Promotion)
+def touch_products_of_promotion(sender, **kwargs):
+    # Promotions change the prices products are served with, so they move Last-Modified.
+    Product.objects.filter(promotions=kwargs['instance']).update(last_update=timezone.now())
+
+
+@receiver(m2m_changed, sender=Product.promotions.through)
+def invalidate_product_promotions_cache(sender, **kwargs):
+    action = kwargs['action']
+    instance = kwargs['instance']
+
+    if not kwargs['reverse'] and action in ['post_add', 'post_remove', 'post_clear']:
+        products = Product.objects.filter(pk=instance.pk)
+    elif kwargs['reverse'] and action in ['post_add', 'post_remove']:
+        products = Product.objects.filter(pk__in=kwargs['pk_set'])
+    elif kwargs['reverse'] and action == 'pre_clear':
+        # After the clear there's no way left to tell which products had the promotion.
+        products = Product.objects.filter(promotions=instance)
+    else:
+        return
+
+    products.update(last_update=timezone.now())
+    caching.invalidate(caching.PRODUCTS)
+
+
+@receiver([post_save, post_delete], sender=Collection)
+def invalidate_collection_cache(sender, **kwargs):
+    caching.invalidate(caching.COLLECTIONS)
+
+
+@receiver([post_save, post_delete], sender=TaggedItem)
+def invalidate_product_tags_cache(sender, **kwargs):
+    instance = kwargs['instance']
+    if instance.content_type_id == ContentType.objects.get_for_model(Product).id:
+        Product.objects.filter(pk=instance.object_id).update(last_update=timezone.now())
+        caching.invalidate(caching.PRODUCTS)
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_label_cache(sender, **kwargs):
+    caching.invalidate(caching.PRODUCTS)
+
+
+@receiver(likes_flushed, sender=Product)
+def invalidate_product_likes_cache(sender, **kwargs):
+    Product.objects.filter(pk__in=kwargs['object_ids']).update(last_update=timezone.now())
+    caching.invalidate(caching.PRODUCTS)
+
+
+@receiver(pre_save, sender=Order)
+def remember_previous_payment_status(sender, **kwargs):
+    instance = kwargs['instance']
+    if instance._state.adding:
+        instance._previous_payment_status = None
+    else:
+        instance._previous_payment_status = Order.objects.filter(pk=instance.pk) \
+            .values_list('payment_status', flat=True).first()
+
+
+def refresh_sales_reports_at(placed_at):
+    placed_at = placed_at.isoformat()
+    transaction.on_commit(lambda: refresh_sales_reports.delay([placed_at]), robust=True)
+
+
+@receiver(post_save, sender=Order)
+def refresh_sales_reports_of_order(sender, **kwargs):
+    # The order may already be rolled up under its old payment status.
+    instance = kwargs['instance']
+    if not kwargs['created'] and getattr(instance, '_previous_payment_status', None) != instance.payment_status:
+        refresh_sales_reports_at(instance.placed_at)
+
+
+@receiver(post_delete, sender=Order)
+def refresh_sales_reports_of_deleted_order(sender, **kwargs):
+    refresh_sales_reports_at(kwargs['instance'].placed_at)
@@ -0,0 +1,78 @@
+import logging
+from datetime import datetime
+
+from celery import shared_task
+from django.utils import timezone
+
+from store import caching, outbox, rollups
+from store.carts import delete_stale_carts
+from store.counters import reconcile_products_count
+from store.images import generate_variants
+from store.models import Product, ProductImage
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reconcile_collection_counts():
+    corrected = reconcile_products_count()
+    logger.info('Reconciled products_count on %s collections.', corrected)
+    return corrected
+
+
+@shared_task
+def generate_image_variants(image_id):
+    product_image = ProductImage.objects.filter(pk=image_id).first()
+    if product_image is None or not product_image.image:
+        return
+
+    variants = generate_variants(product_image.image)
+
+    # update() rather than save() so the post_save handler doesn't schedule us again.
+    ProductImage.objects.filter(pk=image_id).update(variants=variants, last_update=timezone.now())
+    Product.objects.filter(pk=product_image.product_id).update(last_update=timezone.now())
+    caching.invalidate(caching.PRODUCTS)
+
+
+@shared_task(bind=True)
+def delete_stale_cart_batches(self, max_age_days=None):
+    def report(carts, items):
+        self.update_state(state='PROGRESS', meta={'carts': carts, 'items': items})
+        logger.info('Deleted %s stale carts and %s cart items so far.', carts, items)
+
+    carts, items = delete_stale_carts(max_age_days, progress=report)
+    logger.info('Deleted %s stale carts and %s cart items.', carts, items)
+    return {'carts': carts, 'items': items}
+
+
+@shared_task
+def dispatch_outbox():
+    delivered = 0
+    while True:
+        batch = outbox.dispatch()
+        delivered += batch
+        if batch < outbox.DISPATCH_BATCH_SIZE:
+            break
+    if delivered:
+        logger.info('Delivered %s outbox events.', delivered)
+    return delivered
+
+
+@shared_task
+def purge_outbox():
+    purged = outbox.purge_delivered()
+    logger.info('Purged %s delivered outbox events.', purged)
+    return purged
+
+
+@shared_task
+def rollup_sales_reports():
+    hours = rollups.rollup_sales()
+    logger.info('Rolled up %s hours of orders into the sales reports.', hours)
+    return hours
+
+
+@shared_task
+def refresh_sales_reports(placed_at):
+    """`placed_at` is a list of ISO 8601 datetimes of orders that changed after being rolled up."""
+    return rollups.refresh_sales([datetime.fromisoformat(moment) for moment in placed_at])
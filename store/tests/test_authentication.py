@@ -0,0 +1,99 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework_simplejwt.tokens import RefreshToken
+from model_bakery import baker
+
+
+@pytest.fixture
+def user():
+    user = baker.make(settings.AUTH_USER_MODEL)
+    user.set_password('secret-pass-123')
+    user.save()
+    return user
+
+
+def authenticate_with_token(api_client, user):
+    api_client.credentials(HTTP_AUTHORIZATION=f'JWT {RefreshToken.for_user(user).access_token}')
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication():
+    def test_if_user_is_read_once(self, api_client, user, django_assert_max_num_queries):
+        # Arrange
+        authenticate_with_token(api_client, user)
+        api_client.get('/store/customers/me/')
+
+        # Act
+        with django_assert_max_num_queries(2) as captured:
+            response = api_client.get('/store/customers/me/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert not any('core_user' in query['sql'] for query in captured.captured_queries)
+
+    def test_if_password_hash_is_not_cached(self, api_client, user):
+        # Arrange
+        authenticate_with_token(api_client, user)
+
+        # Act
+        api_client.get('/store/customers/me/')
+
+        # Assert
+        cached = cache.get(f'core:auth-user:{user.id}')
+        assert cached is not None
+        assert user.password not in repr(cached)
+
+    def test_if_other_fields_are_read_on_access(self, api_client, user):
+        # Arrange
+        authenticate_with_token(api_client, user)
+        api_client.get('/auth/users/me/')
+
+        # Act
+        response = api_client.get('/auth/users/me/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['email'] == user.email
+
+    def test_if_deactivated_user_returns_401(self, api_client, user, django_capture_on_commit_callbacks):
+        # Arrange
+        authenticate_with_token(api_client, user)
+        api_client.get('/store/customers/me/')
+        user.is_active = False
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+
+        # Act
+        response = api_client.get('/store/customers/me/')
+
+        # Assert
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_password_change_revokes_token(self, api_client, user, django_capture_on_commit_callbacks):
+        # Arrange
+        authenticate_with_token(api_client, user)
+        api_client.get('/store/customers/me/')
+        user.set_password('another-pass-456')
+        with django_capture_on_commit_callbacks(execute=True):
+            user.save()
+
+        # Act
+        response = api_client.get('/store/customers/me/')
+
+        # Assert
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.data['code'] == 'password_changed'
+
+    def test_if_token_without_version_is_accepted(self, api_client, user):
+        # Arrange
+        token = RefreshToken.for_user(user).access_token
+        del token['hash_password']
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+
+        # Act
+        response = api_client.get('/store/customers/me/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
@@ -0,0 +1,282 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from model_bakery import baker
+from store.carts import CacheCartStorage, delete_stale_carts
+from store.models import Cart, CartItem, Product
+from store.serializers import CreateOrderSerializer
+
+
+@pytest.mark.django_db
+class TestAddCartItem():
+    def test_if_adding_twice_sums_quantity(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+        api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id, 'quantity': 2})
+
+        # Act
+        response = api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id, 'quantity': 3})
+
+        # Assert
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['quantity'] == 5
+        assert CartItem.objects.get(cart=cart, product=product).quantity == 5
+
+    def test_if_add_is_a_single_query(self, api_client, django_assert_max_num_queries):
+        # Arrange
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+
+        # Act
+        with django_assert_max_num_queries(3) as captured:
+            response = api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': product.id, 'quantity': 1})
+
+        # Assert
+        assert response.status_code == status.HTTP_201_CREATED
+        assert [query['sql'].strip().split()[0] for query in captured.captured_queries
+                if 'SAVEPOINT' not in query['sql']] == ['INSERT']
+
+    def test_if_product_does_not_exist_returns_400(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+
+        # Act
+        response = api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': 0, 'quantity': 1})
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['product_id'] is not None
+
+    def test_if_cart_does_not_exist_returns_404(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+
+        # Act
+        response = api_client.post('/store/carts/00000000-0000-0000-0000-000000000000/items/',
+                                   {'product_id': product.id, 'quantity': 1})
+
+        # Assert
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_batch_adds_every_item(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+        first, second = baker.make(Product, _quantity=2)
+        baker.make(CartItem, cart=cart, product=first, quantity=1)
+
+        # Act
+        response = api_client.post(f'/store/carts/{cart.id}/items/', [
+            {'product_id': first.id, 'quantity': 2},
+            {'product_id': second.id, 'quantity': 1},
+            {'product_id': second.id, 'quantity': 1},
+        ], format='json')
+
+        # Assert
+        assert response.status_code == status.HTTP_201_CREATED
+        assert dict(CartItem.objects.filter(cart=cart).values_list('product_id', 'quantity')) == {first.id: 3, second.id: 2}
+
+    def test_if_empty_batch_returns_400(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+
+        # Act
+        response = api_client.post(f'/store/carts/{cart.id}/items/', [], format='json')
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_if_batch_with_missing_product_adds_nothing(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+
+        # Act
+        response = api_client.post(f'/store/carts/{cart.id}/items/', [
+            {'product_id': product.id, 'quantity': 1},
+            {'product_id': 0, 'quantity': 1},
+        ], format='json')
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not CartItem.objects.exists()
+
+
+@pytest.fixture
+def cache_cart_storage(settings):
+    settings.CART_STORAGE = 'store.carts.CacheCartStorage'
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('cache_cart_storage')
+class TestCacheCartStorage():
+    def test_if_new_cart_is_not_written_to_database(self, api_client):
+        # Arrange
+        product = baker.make(Product, unit_price=10)
+
+        # Act
+        cart_id = api_client.post('/store/carts/').data['id']
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 2})
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 1})
+        response = api_client.get(f'/store/carts/{cart_id}/')
+
+        # Assert
+        assert not Cart.objects.exists()
+        assert not CartItem.objects.exists()
+        assert response.data['total_price'] == 30
+        assert [(item['id'], item['quantity']) for item in response.data['items']] == [(product.id, 3)]
+
+    def test_if_items_can_be_updated_and_deleted(self, api_client):
+        # Arrange
+        first, second = baker.make(Product, _quantity=2)
+        cart_id = api_client.post('/store/carts/').data['id']
+        api_client.post(f'/store/carts/{cart_id}/items/', [
+            {'product_id': first.id, 'quantity': 1},
+            {'product_id': second.id, 'quantity': 1},
+        ], format='json')
+
+        # Act
+        api_client.patch(f'/store/carts/{cart_id}/items/{first.id}/', {'quantity': 4})
+        api_client.delete(f'/store/carts/{cart_id}/items/{second.id}/')
+        response = api_client.get(f'/store/carts/{cart_id}/items/')
+
+        # Assert
+        assert [(item['id'], item['quantity']) for item in response.data] == [(first.id, 4)]
+
+    def test_if_cursor_pagination_returns_400(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        cart_id = api_client.post('/store/carts/').data['id']
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 1})
+
+        # Act
+        response = api_client.get(f'/store/carts/{cart_id}/items/?pagination=cursor')
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['pagination'] is not None
+
+    def test_if_persist_writes_cart_to_database(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        cart_id = api_client.post('/store/carts/').data['id']
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 2})
+
+        # Act
+        response = api_client.post(f'/store/carts/{cart_id}/persist/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert CartItem.objects.get(cart_id=cart_id).quantity == 2
+        assert api_client.get(f'/store/carts/{cart_id}/').data['items'][0]['quantity'] == 2
+
+    def test_if_checkout_validation_does_not_persist_cart(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        cart_id = api_client.post('/store/carts/').data['id']
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 2})
+        serializer = CreateOrderSerializer(data={'cart_id': cart_id}, context={})
+
+        # Act
+        valid = serializer.is_valid()
+
+        # Assert
+        assert valid
+        assert not Cart.objects.exists()
+
+    def test_if_persist_keeps_cart_age(self, api_client):
+        # Arrange
+        cart_id = api_client.post('/store/carts/').data['id']
+        created_at = cache.get(f'store:cart:{cart_id}')['created_at']
+
+        # Act
+        api_client.post(f'/store/carts/{cart_id}/persist/')
+
+        # Assert
+        assert Cart.objects.get(pk=cart_id).created_at == created_at
+
+    def test_if_written_cart_is_not_written_again(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        cart_id = api_client.post('/store/carts/').data['id']
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 2})
+        CacheCartStorage().write(cart_id)
+
+        # Act
+        CacheCartStorage().write(cart_id)
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 1})
+
+        # Assert
+        assert Cart.objects.count() == 1
+        assert CartItem.objects.get(cart_id=cart_id).quantity == 3
+
+    def test_if_failed_checkout_restores_cached_cart(self, api_client):
+        # Arrange
+        product = baker.make(Product, inventory=0)
+        cart_id = api_client.post('/store/carts/').data['id']
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 1})
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+
+        # Act
+        response = api_client.post('/store/orders/', {'cart_id': cart_id})
+
+        # Assert
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Cart.objects.exists()
+        assert api_client.get(f'/store/carts/{cart_id}/').data['items'][0]['quantity'] == 1
+
+    def test_if_checkout_converts_cached_cart(self, api_client):
+        # Arrange
+        product = baker.make(Product, inventory=10)
+        cart_id = api_client.post('/store/carts/').data['id']
+        api_client.post(f'/store/carts/{cart_id}/items/', {'product_id': product.id, 'quantity': 2})
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+
+        # Act
+        response = api_client.post('/store/orders/', {'cart_id': cart_id})
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['items'][0]['quantity'] == 2
+        assert not Cart.objects.exists()
+
+
+@pytest.mark.django_db
+class TestDeleteStaleCarts():
+    def test_if_only_old_carts_are_deleted_in_batches(self):
+        # Arrange
+        old_carts = baker.make(Cart, _quantity=5)
+        for cart in old_carts:
+            baker.make(CartItem, cart=cart, quantity=1)
+        Cart.objects.update(created_at=timezone.now() - timedelta(days=31))
+        fresh = baker.make(Cart)
+        reports = []
+
+        # Act
+        totals = delete_stale_carts(30, batch_size=2, pause=0, progress=lambda *counts: reports.append(counts))
+
+        # Assert
+        assert totals == (5, 5)
+        assert reports == [(2, 2), (4, 4), (5, 5)]
+        assert list(Cart.objects.all()) == [fresh]
+
+
+@pytest.mark.django_db
+class TestCartTotals():
+    def test_if_totals_are_summed_in_the_database(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=baker.make(Product, unit_price=Decimal('1.10')), quantity=3)
+        baker.make(CartItem, cart=cart, product=baker.make(Product, unit_price=Decimal('2.00')), quantity=1)
+
+        # Act
+        response = api_client.get(f'/store/carts/{cart.id}/')
+
+        # Assert
+        assert response.data['total_price'] == Decimal('5.30')
+        assert sorted(item['total_price'] for item in response.data['items']) == [Decimal('2.00'), Decimal('3.30')]
@@ -1,7 +1,8 @@
 import pytest
 from rest_framework import status
 from model_bakery import baker
-from store.models import Collection
+from store.models import Collection, Product
+from store.counters import reconcile_products_count
 
 @pytest.fixture
 def create_collection(api_client):
@@ -76,6 +77,54 @@ class TestRetrieveCollections():
             'products_count': 0,
         }
 
+    def test_if_cached_collection_follows_edits(self, api_client, django_capture_on_commit_callbacks):
+        # Arrange
+        collection = baker.make(Collection, title='Old title')
+        api_client.get(f'/store/collections/{collection.id}/')
+        api_client.get('/store/collections/')
+
+        # Act
+        with django_capture_on_commit_callbacks(execute=True):
+            collection.title = 'New title'
+            collection.save()
+            baker.make(Collection, title='Another')
+
+        # Assert
+        assert api_client.get(f'/store/collections/{collection.id}/').data['title'] == 'New title'
+        assert sorted(row['title'] for row in api_client.get('/store/collections/').data) == ['Another', 'New title']
+
+
+@pytest.mark.django_db
+class TestCollectionProductsCount():
+    def test_if_products_count_follows_product_changes(self):
+        # Arrange
+        collection, other_collection = baker.make(Collection, _quantity=2)
+        products = baker.make(Product, collection=collection, _quantity=3)
+
+        # Act
+        products[0].delete()
+        products[1].collection = other_collection
+        products[1].save()
+
+        # Assert
+        collection.refresh_from_db()
+        other_collection.refresh_from_db()
+        assert collection.products_count == 1
+        assert other_collection.products_count == 1
+
+    def test_if_reconcile_fixes_drift(self):
+        # Arrange
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=2)
+        Collection.objects.filter(pk=collection.pk).update(products_count=7)
+
+        # Act
+        corrected = reconcile_products_count()
+
+        # Assert
+        collection.refresh_from_db()
+        assert corrected == 1
+        assert collection.products_count == 2
 
 
 #########################################################
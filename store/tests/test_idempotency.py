@@ -0,0 +1,96 @@
+import pytest
+from django.conf import settings
+from rest_framework import status
+from model_bakery import baker
+from store.models import Cart, CartItem, Order, Product
+
+KEY = '3f2b8c1e-6d4a-4f7e-9a51-0c2d7b9e8f13'
+
+
+@pytest.mark.django_db
+class TestIdempotencyKey():
+    def test_if_retried_cart_create_returns_same_cart(self, api_client):
+        # Act
+        first = api_client.post('/store/carts/', HTTP_IDEMPOTENCY_KEY=KEY)
+        retry = api_client.post('/store/carts/', HTTP_IDEMPOTENCY_KEY=KEY)
+
+        # Assert
+        assert retry.status_code == status.HTTP_201_CREATED
+        assert retry.data['id'] == first.data['id']
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert Cart.objects.count() == 1
+
+    def test_if_requests_without_key_are_not_replayed(self, api_client):
+        # Act
+        api_client.post('/store/carts/')
+        api_client.post('/store/carts/')
+
+        # Assert
+        assert Cart.objects.count() == 2
+
+    def test_if_retried_cart_item_add_is_not_applied_twice(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+        product = baker.make(Product)
+        data = {'product_id': product.id, 'quantity': 2}
+
+        # Act
+        api_client.post(f'/store/carts/{cart.id}/items/', data, HTTP_IDEMPOTENCY_KEY=KEY)
+        api_client.post(f'/store/carts/{cart.id}/items/', data, HTTP_IDEMPOTENCY_KEY=KEY)
+
+        # Assert
+        assert CartItem.objects.get().quantity == 2
+
+    def test_if_key_reused_with_other_body_returns_422(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+        first, second = baker.make(Product, _quantity=2)
+        api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': first.id, 'quantity': 1},
+                        HTTP_IDEMPOTENCY_KEY=KEY)
+
+        # Act
+        response = api_client.post(f'/store/carts/{cart.id}/items/', {'product_id': second.id, 'quantity': 1},
+                                   HTTP_IDEMPOTENCY_KEY=KEY)
+
+        # Assert
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    def test_if_retried_checkout_is_a_cache_hit(self, api_client, django_assert_num_queries):
+        # Arrange
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=baker.make(Product, inventory=5), quantity=1)
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+        first = api_client.post('/store/orders/', {'cart_id': cart.id}, HTTP_IDEMPOTENCY_KEY=KEY)
+
+        # Act
+        with django_assert_num_queries(0):
+            retry = api_client.post('/store/orders/', {'cart_id': cart.id}, HTTP_IDEMPOTENCY_KEY=KEY)
+
+        # Assert
+        assert retry.status_code == status.HTTP_200_OK
+        assert retry.data == first.data
+        assert Order.objects.count() == 1
+
+    def test_if_anonymous_key_is_not_a_uuid_returns_400(self, api_client):
+        # Act
+        response = api_client.post('/store/carts/', HTTP_IDEMPOTENCY_KEY='1')
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Cart.objects.exists()
+
+    def test_if_out_of_stock_checkout_is_not_replayed(self, api_client):
+        # Arrange
+        cart = baker.make(Cart)
+        product = baker.make(Product, inventory=0)
+        baker.make(CartItem, cart=cart, product=product, quantity=1)
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+        api_client.post('/store/orders/', {'cart_id': cart.id}, HTTP_IDEMPOTENCY_KEY='checkout-1')
+        Product.objects.filter(pk=product.pk).update(inventory=5)
+
+        # Act
+        retry = api_client.post('/store/orders/', {'cart_id': cart.id}, HTTP_IDEMPOTENCY_KEY='checkout-1')
+
+        # Assert
+        assert retry.status_code == status.HTTP_200_OK
+        assert Order.objects.count() == 1
@@ -0,0 +1,452 @@
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+from django.conf import settings
+from django.db import OperationalError, connection
+from django.utils import timezone
+from rest_framework import status
+from model_bakery import baker
+from store import outbox
+from store.inventory import InsufficientStock, reserve_stock
+from store.models import Cart, CartItem, Customer, Order, OrderItem, OutboxEvent, Product
+from store.serializers import CreateOrderSerializer
+from store.signals import order_created
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+@pytest.fixture
+def customer_user():
+    return baker.make(settings.AUTH_USER_MODEL)
+
+
+def make_order(customer, *lines):
+    order = baker.make(Order, customer=customer)
+    for quantity, unit_price in lines:
+        baker.make(OrderItem, order=order, product=baker.make(Product), quantity=quantity, unit_price=unit_price)
+    return order
+
+
+@pytest.mark.django_db
+class TestOrderTotals():
+    def test_if_totals_are_summed_in_the_database(self, api_client, customer_user):
+        # Arrange
+        order = make_order(customer_user.customer, (2, Decimal('10.25')), (1, Decimal('0.50')))
+        api_client.force_authenticate(user=customer_user)
+
+        # Act
+        response = api_client.get(f'/store/orders/{order.id}/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total_price'] == Decimal('21.00')
+        assert sorted(item['total_price'] for item in response.data['items']) == [Decimal('0.50'), Decimal('20.50')]
+
+    def test_if_order_without_items_totals_zero(self, api_client, customer_user):
+        # Arrange
+        order = make_order(customer_user.customer)
+        api_client.force_authenticate(user=customer_user)
+
+        # Act
+        response = api_client.get(f'/store/orders/{order.id}/')
+
+        # Assert
+        assert response.data['total_price'] == 0
+
+    def test_if_history_lists_customer_orders_with_totals(self, api_client, customer_user):
+        # Arrange
+        make_order(customer_user.customer, (3, Decimal('2.00')))
+        make_order(baker.make(settings.AUTH_USER_MODEL).customer, (1, Decimal('5.00')))
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL, is_staff=True, is_superuser=True))
+
+        # Act
+        response = api_client.get(f'/store/customers/{customer_user.customer.id}/history/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert [order['total_price'] for order in response.data] == [Decimal('6.00')]
+
+
+def fill_cart(*lines):
+    cart = baker.make(Cart)
+    for product, quantity in lines:
+        baker.make(CartItem, cart=cart, product=product, quantity=quantity)
+    return cart
+
+
+@pytest.mark.django_db
+class TestCheckoutInventory():
+    def test_if_checkout_takes_items_out_of_stock(self, api_client, customer_user):
+        # Arrange
+        product = baker.make(Product, inventory=5)
+        cart = fill_cart((product, 2))
+        api_client.force_authenticate(user=customer_user)
+
+        # Act
+        response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        product.refresh_from_db()
+        assert product.inventory == 3
+
+    def test_if_short_items_are_listed_and_nothing_is_reserved(self, api_client, customer_user):
+        # Arrange
+        in_stock = baker.make(Product, inventory=5)
+        short = baker.make(Product, inventory=1)
+        cart = fill_cart((in_stock, 2), (short, 3))
+        api_client.force_authenticate(user=customer_user)
+
+        # Act
+        response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        # Assert
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.data['items'] == [
+            {'product_id': short.id, 'title': short.title, 'requested': 3, 'available': 1}
+        ]
+        in_stock.refresh_from_db()
+        assert in_stock.inventory == 5
+        assert not Order.objects.exists()
+        assert Cart.objects.filter(pk=cart.pk).exists()
+
+    def test_if_reservation_moves_product_etag(self, api_client, customer_user):
+        # Arrange
+        product = baker.make(Product, inventory=10)
+        api_client.force_authenticate(user=customer_user)
+        etag = api_client.get(f'/store/products/{product.id}/')['ETag']
+
+        # Act
+        reserve_stock({product.id: 3})
+
+        # Assert
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['inventory'] == 7
+
+    def test_if_only_selling_out_drops_cached_products(self, django_capture_on_commit_callbacks):
+        # Arrange
+        plenty, last_one = baker.make(Product, inventory=5), baker.make(Product, inventory=1)
+
+        # Act
+        with django_capture_on_commit_callbacks() as kept:
+            reserve_stock({plenty.id: 1})
+        with django_capture_on_commit_callbacks() as sold_out:
+            reserve_stock({last_one.id: 1})
+
+        # Assert
+        assert (len(kept), len(sold_out)) == (0, 1)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCheckoutConcurrency():
+    def test_if_parallel_checkouts_never_oversell(self):
+        # Arrange
+        stock, buyers = 20, 40
+        product = baker.make(Product, inventory=stock)
+        users = baker.make(settings.AUTH_USER_MODEL, _quantity=buyers)
+        carts = [fill_cart((product, 1)) for _ in users]
+
+        def checkout(user, cart):
+            try:
+                serializer = CreateOrderSerializer(data={'cart_id': cart.id}, context={'customer_id': user.customer.id})
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+                return True
+            except (InsufficientStock, OperationalError):
+                return False
+            finally:
+                connection.close()
+
+        # Act
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            placed = sum(executor.map(checkout, users, carts))
+
+        # Assert
+        product.refresh_from_db()
+        assert product.inventory >= 0
+        assert product.inventory == stock - placed
+        assert OrderItem.objects.filter(product=product).count() == placed
+        assert placed > 0
+        if connection.vendor == 'postgresql':
+            # SQLite locks the whole database, so only PostgreSQL can place every order.
+            assert placed == stock
+
+
+@pytest.mark.django_db
+class TestListOrders():
+    @pytest.mark.parametrize('orders', [1, 10])
+    def test_if_query_count_does_not_grow_with_orders(self, api_client, customer_user, orders,
+                                                      django_assert_num_queries):
+        # Arrange
+        for _ in range(orders):
+            make_order(customer_user.customer, (1, Decimal('1.00')), (2, Decimal('3.00')))
+        api_client.force_authenticate(user=customer_user)
+
+        # Act
+        # count, orders with their totals, items with their products
+        with django_assert_num_queries(3):
+            response = api_client.get('/store/orders/')
+
+        # Assert
+        assert response.data['count'] == orders
+        assert all(len(order['items']) == 2 for order in response.data['results'])
+
+    def test_if_list_is_paginated_newest_first(self, api_client, customer_user):
+        # Arrange
+        make_order(customer_user.customer)
+        newer = make_order(customer_user.customer)
+        api_client.force_authenticate(user=customer_user)
+
+        # Act
+        response = api_client.get('/store/orders/?page_size=1')
+
+        # Assert
+        assert response.data['count'] == 2
+        assert [order['id'] for order in response.data['results']] == [newer.id]
+
+
+@pytest.mark.django_db
+class TestCustomerClaims():
+    def test_if_token_claims_customer_and_staff(self, api_client):
+        # Arrange
+        user = baker.make(settings.AUTH_USER_MODEL, username='buyer')
+        user.set_password('secret-pass-123')
+        user.save()
+
+        # Act
+        response = api_client.post('/auth/jwt/create/', {'username': 'buyer', 'password': 'secret-pass-123'})
+
+        # Assert
+        token = RefreshToken(response.data['refresh'])
+        assert token['customer_id'] == user.customer.id
+        assert token['is_staff'] is False
+        assert token.access_token['customer_id'] == user.customer.id
+
+    @pytest.mark.parametrize('claims', [{'customer_id': True}, {}])
+    def test_if_orders_are_listed_with_or_without_claim(self, api_client, customer_user, claims,
+                                                        django_assert_max_num_queries):
+        # Arrange
+        order = make_order(customer_user.customer)
+        make_order(baker.make(settings.AUTH_USER_MODEL).customer)
+        token = RefreshToken.for_user(customer_user).access_token
+        if claims:
+            token['customer_id'] = customer_user.customer.id
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+
+        # Act
+        with django_assert_max_num_queries(4) as captured:
+            response = api_client.get('/store/orders/')
+
+        # Assert
+        assert [row['id'] for row in response.data['results']] == [order.id]
+        assert any('store_customer' in query['sql'] for query in captured.captured_queries) != bool(claims)
+
+    def test_if_stale_staff_claim_grants_nothing(self, api_client, customer_user):
+        # Arrange
+        token = RefreshToken.for_user(customer_user).access_token
+        token['is_staff'] = True
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+
+        # Act
+        api_client.put('/store/customers/me/', {'user_id': customer_user.id, 'phone': '555-0100',
+                                                 'membership': Customer.MEMBERSHIP_GOLD})
+
+        # Assert
+        customer_user.customer.refresh_from_db()
+        assert customer_user.customer.membership != Customer.MEMBERSHIP_GOLD
+
+    def test_if_checkout_with_claim_does_not_look_up_customer(self, api_client, customer_user,
+                                                              django_assert_max_num_queries):
+        # Arrange
+        cart = fill_cart((baker.make(Product, inventory=1), 1))
+        token = RefreshToken.for_user(customer_user).access_token
+        token['customer_id'] = customer_user.customer.id
+        api_client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+
+        # Act
+        with django_assert_max_num_queries(30) as captured:
+            response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        # Assert
+        assert response.data['customer_id'] == customer_user.customer.id
+        assert not any('FROM "store_customer"' in query['sql'] for query in captured.captured_queries)
+
+
+@pytest.mark.django_db
+class TestOrderCreatedOutbox():
+    @pytest.fixture
+    def received(self):
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append(kwargs['order'].id)
+
+        order_created.connect(receiver)
+        yield received
+        order_created.disconnect(receiver)
+
+    def test_if_checkout_only_records_the_event(self, api_client, customer_user, received):
+        # Arrange
+        cart = fill_cart((baker.make(Product, inventory=1), 1))
+        api_client.force_authenticate(user=customer_user)
+
+        # Act
+        order_id = api_client.post('/store/orders/', {'cart_id': cart.id}).data['id']
+
+        # Assert
+        assert received == []
+        assert OutboxEvent.objects.get().payload == {'order_id': order_id}
+
+    def test_if_dispatch_delivers_each_event_once(self, customer_user, received):
+        # Arrange
+        order = make_order(customer_user.customer)
+        OutboxEvent.objects.create(topic='order_created', payload={'order_id': order.id})
+
+        # Act
+        first, second = outbox.dispatch(), outbox.dispatch()
+
+        # Assert
+        assert (first, second) == (1, 0)
+        assert received == [order.id]
+        assert OutboxEvent.objects.get().delivered_at is not None
+
+    def test_if_failed_delivery_is_retried_later(self, customer_user):
+        # Arrange
+        order = make_order(customer_user.customer)
+        event = OutboxEvent.objects.create(topic='order_created', payload={'order_id': order.id})
+
+        def failing_receiver(sender, **kwargs):
+            raise RuntimeError('mail server down')
+
+        order_created.connect(failing_receiver)
+        try:
+            # Act
+            delivered = outbox.dispatch()
+        finally:
+            order_created.disconnect(failing_receiver)
+
+        # Assert
+        event.refresh_from_db()
+        assert delivered == 0
+        assert event.delivered_at is None
+        assert event.attempts == 1
+        assert event.available_at > timezone.now()
+        assert 'mail server down' in event.last_error
+        assert outbox.dispatch() == 0
+
+    def test_if_event_out_of_attempts_is_marked_failed(self, customer_user):
+        # Arrange
+        order = make_order(customer_user.customer)
+        event = OutboxEvent.objects.create(topic='order_created', payload={'order_id': order.id},
+                                           attempts=outbox.MAX_ATTEMPTS - 1)
+
+        def failing_receiver(sender, **kwargs):
+            raise RuntimeError('mail server down')
+
+        order_created.connect(failing_receiver)
+        try:
+            # Act
+            outbox.dispatch()
+        finally:
+            order_created.disconnect(failing_receiver)
+
+        # Assert
+        event.refresh_from_db()
+        assert event.failed_at is not None
+        assert event.delivered_at is None
+        assert outbox.retry_failed(OutboxEvent.objects.all()) == 1
+        assert outbox.dispatch() == 1
+
+
+@pytest.mark.django_db
+class TestBulkPaymentStatus():
+    def test_if_user_is_not_admin_returns_403(self, api_client, customer_user):
+        # Arrange
+        order = make_order(customer_user.customer)
+        api_client.force_authenticate(user=customer_user)
+
+        # Act
+        response = api_client.post('/store/orders/payment-status/', {
+            'transitions': [{'order_id': order.id, 'payment_status': Order.PAYMENT_STATUS_COMPLETE}],
+        }, format='json')
+
+        # Assert
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_each_order_gets_an_outcome(self, api_client, customer_user, django_assert_max_num_queries):
+        # Arrange
+        first, second, failed, complete = [make_order(customer_user.customer) for _ in range(4)]
+        Order.objects.filter(pk=failed.pk).update(payment_status=Order.PAYMENT_STATUS_FAILED)
+        Order.objects.filter(pk=complete.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL, is_staff=True))
+
+        # Act
+        with django_assert_max_num_queries(8) as captured:
+            response = api_client.post('/store/orders/payment-status/', {'transitions': [
+                {'order_id': first.id, 'payment_status': Order.PAYMENT_STATUS_COMPLETE},
+                {'order_id': second.id, 'payment_status': Order.PAYMENT_STATUS_COMPLETE},
+                {'order_id': failed.id, 'payment_status': Order.PAYMENT_STATUS_FAILED},
+                {'order_id': complete.id, 'payment_status': Order.PAYMENT_STATUS_PENDING},
+                {'order_id': 0, 'payment_status': Order.PAYMENT_STATUS_COMPLETE},
+            ]}, format='json')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert {row['order_id']: row['outcome'] for row in response.data['results']} == {
+            first.id: 'updated', second.id: 'updated', failed.id: 'unchanged', complete.id: 'not_allowed', 0: 'not_found',
+        }
+        assert len([query for query in captured.captured_queries if query['sql'].startswith('UPDATE')]) == 1
+        assert set(Order.objects.filter(pk__in=[first.id, second.id]).values_list('payment_status', flat=True)) == \
+            {Order.PAYMENT_STATUS_COMPLETE}
+        assert OutboxEvent.objects.get(topic='payment_status_changed').payload == {'changes': [
+            {'order_id': first.id, 'from': Order.PAYMENT_STATUS_PENDING, 'to': Order.PAYMENT_STATUS_COMPLETE},
+            {'order_id': second.id, 'from': Order.PAYMENT_STATUS_PENDING, 'to': Order.PAYMENT_STATUS_COMPLETE},
+        ]}
+
+    def test_if_conflicting_statuses_for_one_order_returns_400(self, api_client, customer_user):
+        # Arrange
+        order = make_order(customer_user.customer)
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL, is_staff=True))
+
+        # Act
+        response = api_client.post('/store/orders/payment-status/', {'transitions': [
+            {'order_id': order.id, 'payment_status': Order.PAYMENT_STATUS_COMPLETE},
+            {'order_id': order.id, 'payment_status': Order.PAYMENT_STATUS_FAILED},
+        ]}, format='json')
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Order.objects.get().payment_status == Order.PAYMENT_STATUS_PENDING
+
+
+@pytest.mark.django_db
+class TestUpdatePaymentStatus():
+    def test_if_allowed_move_is_published(self, api_client, customer_user):
+        # Arrange
+        order = make_order(customer_user.customer)
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL, is_staff=True))
+
+        # Act
+        response = api_client.patch(f'/store/orders/{order.id}/', {'payment_status': Order.PAYMENT_STATUS_COMPLETE})
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'payment_status': Order.PAYMENT_STATUS_COMPLETE}
+        assert OutboxEvent.objects.get(topic='payment_status_changed').payload == {'changes': [
+            {'order_id': order.id, 'from': Order.PAYMENT_STATUS_PENDING, 'to': Order.PAYMENT_STATUS_COMPLETE},
+        ]}
+
+    def test_if_move_out_of_complete_returns_400(self, api_client, customer_user):
+        # Arrange
+        order = make_order(customer_user.customer)
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL, is_staff=True))
+
+        # Act
+        response = api_client.patch(f'/store/orders/{order.id}/', {'payment_status': Order.PAYMENT_STATUS_PENDING})
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert Order.objects.get().payment_status == Order.PAYMENT_STATUS_COMPLETE
+        assert not OutboxEvent.objects.filter(topic='payment_status_changed').exists()
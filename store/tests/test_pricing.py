@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import pytest
+from rest_framework import status
+from model_bakery import baker
+from store.models import Collection, Product, Promotion
+
+
+@pytest.mark.django_db
+class TestProductPricing():
+    def test_if_best_promotion_is_applied(self, api_client):
+        # Arrange
+        product = baker.make(Product, unit_price=Decimal('19.99'))
+        product.promotions.set([baker.make(Promotion, discount=10), baker.make(Promotion, discount=25)])
+
+        # Act
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        # Assert
+        assert response.data['unit_price'] == Decimal('19.99')
+        assert response.data['discounted_price'] == Decimal('14.99')
+        assert response.data['price_with_tax'] == Decimal('16.49')
+
+    def test_if_no_promotion_tax_is_exact(self, api_client):
+        # Arrange
+        product = baker.make(Product, unit_price=Decimal('10'))
+
+        # Act
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        # Assert
+        assert response.data['discounted_price'] == Decimal('10')
+        assert response.data['price_with_tax'] == Decimal('11.00')
+
+    def test_if_list_pricing_does_not_query_per_product(self, api_client, django_assert_max_num_queries):
+        # Arrange
+        promotion = baker.make(Promotion, discount=50)
+        for product in baker.make(Product, unit_price=Decimal('4'), _quantity=20):
+            product.promotions.add(promotion)
+
+        # Act
+        with django_assert_max_num_queries(3):
+            response = api_client.get('/store/products/?page_size=20&omit=images')
+
+        # Assert
+        assert {product['discounted_price'] for product in response.data['results']} == {Decimal('2.00')}
+
+    def test_if_pricing_adds_no_queries_at_1000_products(self, api_client, django_assert_max_num_queries):
+        # Arrange
+        collection = baker.make(Collection)
+        promotions = baker.make(Promotion, _quantity=5)
+        products = Product.objects.bulk_create(
+            Product(title=f'Product {i}', slug=f'product-{i}', unit_price=Decimal('9.99'), inventory=10, collection=collection)
+            for i in range(1000)
+        )
+        Product.promotions.through.objects.bulk_create(
+            Product.promotions.through(product_id=product.id, promotion_id=promotions[i % 5].id)
+            for i, product in enumerate(products)
+        )
+        page = '/store/products/?page_size=1000&omit=images'
+
+        # Act
+        with django_assert_max_num_queries(100) as without_pricing:
+            api_client.get(f'{page},discounted_price,price_with_tax')
+        with django_assert_max_num_queries(100) as with_pricing:
+            response = api_client.get(page)
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.data['results']) == 1000
+        assert len(with_pricing.captured_queries) == len(without_pricing.captured_queries)
@@ -0,0 +1,71 @@
+import io
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework import status
+from model_bakery import baker
+from store.models import Product, ProductImage
+from store.tasks import generate_image_variants
+
+
+@pytest.fixture
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def create_product_image(media_root):
+    def do_create_product_image(size=(800, 600)):
+        content = io.BytesIO()
+        Image.new('RGB', size, 'red').save(content, format='PNG')
+        upload = SimpleUploadedFile('shoe.png', content.getvalue(), content_type='image/png')
+        return ProductImage.objects.create(product=baker.make(Product), image=upload)
+    return do_create_product_image
+
+
+@pytest.mark.django_db
+class TestProductImageVariants():
+    def test_if_variants_are_stored_next_to_original(self, create_product_image, media_root):
+        # Arrange
+        product_image = create_product_image()
+
+        # Act
+        generate_image_variants(product_image.id)
+
+        # Assert
+        product_image.refresh_from_db()
+        assert set(product_image.variants) == {'thumbnail', 'small', 'large'}
+        thumbnail = Image.open(media_root / product_image.variants['thumbnail'])
+        assert thumbnail.size == (150, 150)
+        small = Image.open(media_root / product_image.variants['small'])
+        assert small.format == 'WEBP'
+        assert small.size == (480, 360)
+        assert product_image.variants['small'].startswith('store/images/shoe')
+
+    def test_if_variant_names_are_content_hashed(self, create_product_image):
+        # Arrange
+        product_image = create_product_image()
+        generate_image_variants(product_image.id)
+        product_image.refresh_from_db()
+        first_variants = product_image.variants
+
+        # Act
+        generate_image_variants(product_image.id)
+
+        # Assert
+        product_image.refresh_from_db()
+        assert product_image.variants == first_variants
+
+    def test_if_api_exposes_variant_urls(self, create_product_image, api_client):
+        # Arrange
+        product_image = create_product_image()
+        generate_image_variants(product_image.id)
+
+        # Act
+        response = api_client.get(f'/store/products/{product_image.product_id}/images/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['variants']['thumbnail'].endswith('.thumbnail.jpg')
@@ -0,0 +1,508 @@
+import json
+import time
+from datetime import timedelta
+
+import pytest
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from rest_framework import status
+from model_bakery import baker
+from django.utils import timezone
+from store.models import Product, Collection, Order, OrderItem
+from store.rollups import rollup_sales
+from likes import counters
+from likes.models import Like
+from tags.models import Tag, TaggedItem
+
+
+@pytest.mark.django_db
+class TestListProducts():
+    def test_if_cursor_pagination_walks_every_product_once(self, api_client):
+        # Arrange
+        products = baker.make(Product, title='Same title', _quantity=25)
+
+        # Act
+        seen = []
+        url = '/store/products/?pagination=cursor'
+        while url:
+            response = api_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            seen += [product['id'] for product in response.data['results']]
+            url = response.data['next']
+
+        # Assert
+        assert 'count' not in response.data
+        assert seen == sorted(product.id for product in products)
+
+    def test_if_cursor_pagination_follows_ordering_filter(self, api_client):
+        # Arrange
+        baker.make(Product, unit_price=5, _quantity=12)
+        baker.make(Product, unit_price=10, _quantity=3)
+
+        # Act
+        first_page = api_client.get('/store/products/?pagination=cursor&ordering=-unit_price')
+        second_page = api_client.get(first_page.data['next'])
+        previous_page = api_client.get(second_page.data['previous'])
+
+        # Assert
+        prices = [product['unit_price'] for product in first_page.data['results'] + second_page.data['results']]
+        assert prices == sorted(prices, reverse=True)
+        assert len(second_page.data['results']) == 5
+        assert second_page.data['next'] is None
+        assert previous_page.data['results'] == first_page.data['results']
+
+    def test_if_invalid_cursor_returns_404(self, api_client):
+        # Act
+        response = api_client.get('/store/products/?pagination=cursor&cursor=cD1ub3QtanNvbg==')
+
+        # Assert
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_if_page_number_pagination_is_the_default(self, api_client):
+        # Arrange
+        baker.make(Product, _quantity=3)
+
+        # Act
+        response = api_client.get('/store/products/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 3
+
+
+@pytest.mark.django_db
+class TestCacheProducts():
+    def test_if_repeated_anonymous_read_is_served_from_cache(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        api_client.get(f'/store/products/{product.id}/')
+
+        # Act
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response['X-Cache'] == 'HIT'
+        assert response.data['title'] == product.title
+
+    def test_if_query_string_order_shares_cache_entry(self, api_client):
+        # Arrange
+        baker.make(Product, unit_price=5)
+        api_client.get('/store/products/?unit_price__gte=1&unit_price__lte=10')
+
+        # Act
+        response = api_client.get('/store/products/?unit_price__lte=10&unit_price__gte=1')
+
+        # Assert
+        assert response['X-Cache'] == 'HIT'
+
+    def test_if_product_update_invalidates_cache(self, api_client, django_capture_on_commit_callbacks):
+        # Arrange
+        product = baker.make(Product)
+        api_client.get(f'/store/products/{product.id}/')
+
+        # Act
+        with django_capture_on_commit_callbacks(execute=True):
+            product.title = 'Updated'
+            product.save()
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        # Assert
+        assert response['X-Cache'] == 'MISS'
+        assert response.data['title'] == 'Updated'
+
+
+@pytest.mark.django_db
+class TestConditionalGetProducts():
+    def test_if_etag_matches_return_304(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        etag = api_client.get(f'/store/products/{product.id}/')['ETag']
+
+        # Act
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        # Assert
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+
+    def test_if_etag_is_stale_return_200(self, authenticate, api_client):
+        # Arrange
+        authenticate()
+        product = baker.make(Product)
+        etag = api_client.get('/store/products/')['ETag']
+        baker.make(Product, collection=product.collection)
+
+        # Act
+        response = api_client.get('/store/products/', HTTP_IF_NONE_MATCH=etag)
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+        assert response.data['count'] == 2
+
+    def test_if_not_modified_since_return_304(self, authenticate, api_client):
+        # Arrange
+        authenticate()
+        product = baker.make(Product)
+        last_modified = api_client.get(f'/store/products/{product.id}/')['Last-Modified']
+
+        # Act
+        response = api_client.get(f'/store/products/{product.id}/', HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        # Assert
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    def test_if_etag_follows_query_and_format(self, authenticate, api_client):
+        # Arrange
+        authenticate()
+        baker.make(Product, _quantity=2)
+
+        # Act
+        etags = [
+            api_client.get(url, HTTP_ACCEPT=accept)['ETag']
+            for url, accept in [
+                ('/store/products/', 'application/json'),
+                ('/store/products/?ordering=-unit_price', 'application/json'),
+                ('/store/products/?fields=id', 'application/json'),
+                ('/store/products/', 'text/html'),
+            ]
+        ]
+
+        # Assert
+        assert len(set(etags)) == 4
+
+    @pytest.mark.parametrize('url', ['/store/products/abc/', '/store/collections/abc/'])
+    def test_if_id_is_malformed_return_404(self, api_client, url):
+        # Act
+        response = api_client.get(url)
+
+        # Assert
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestSparseFieldsetProducts():
+    def test_if_fields_selects_response_fields(self, api_client):
+        # Arrange
+        baker.make(Product)
+
+        # Act
+        response = api_client.get('/store/products/?fields=id,title,unit_price')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.data['results'][0]) == {'id', 'title', 'unit_price'}
+
+    def test_if_omit_drops_response_fields(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+
+        # Act
+        response = api_client.get(f'/store/products/{product.id}/?omit=description,images')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert 'description' not in response.data
+        assert 'images' not in response.data
+        assert 'price_with_tax' in response.data
+
+    def test_if_unrequested_columns_are_not_loaded(self, api_client, django_assert_num_queries):
+        # Arrange
+        baker.make(Product, _quantity=3)
+
+        # Act
+        with django_assert_num_queries(3) as context:
+            api_client.get('/store/products/?fields=title,unit_price')
+
+        # Assert
+        select = context.captured_queries[-1]['sql']
+        assert '"description"' not in select
+        assert 'store_productimage' not in ''.join(query['sql'] for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+class TestSearchProducts():
+    def test_if_search_matches_title_or_description(self, api_client):
+        # Arrange
+        baker.make(Product, title='Red running shoes', description='')
+        baker.make(Product, title='Blue hat', description='Great for running')
+        baker.make(Product, title='Green scarf', description='Warm')
+
+        # Act
+        response = api_client.get('/store/products/?search=running')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert {product['title'] for product in response.data['results']} == {'Red running shoes', 'Blue hat'}
+
+
+@pytest.mark.django_db
+class TestExportProducts():
+    def test_if_user_is_not_admin_return_403(self, authenticate, api_client):
+        # Arrange
+        authenticate(is_staff=False)
+
+        # Act
+        response = api_client.get('/store/products/export/')
+
+        # Assert
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_ndjson_streams_filtered_products(self, authenticate, api_client):
+        # Arrange
+        authenticate(is_staff=True)
+        baker.make(Product, unit_price=5, _quantity=3)
+        baker.make(Product, unit_price=50)
+
+        # Act
+        response = api_client.get('/store/products/export/?unit_price__lte=10')
+
+        # Assert
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        assert len(lines) == 3
+        assert json.loads(lines[0])['unit_price'] == 5
+
+    def test_if_csv_has_header_and_one_row_per_product(self, authenticate, api_client):
+        # Arrange
+        authenticate(is_staff=True)
+        baker.make(Product, _quantity=2)
+
+        # Act
+        response = api_client.get('/store/products/export/?output=csv&fields=id,title')
+
+        # Assert
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert lines[0] == 'id,title'
+        assert len(lines) == 3
+
+
+@pytest.mark.django_db
+class TestImportProducts():
+    def test_if_user_is_not_admin_return_403(self, authenticate, api_client):
+        # Arrange
+        authenticate(is_staff=False)
+
+        # Act
+        response = api_client.post('/store/products/import/', 'slug\n', content_type='text/csv')
+
+        # Assert
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_csv_upserts_by_slug_and_reports_bad_rows(self, authenticate, api_client):
+        # Arrange
+        authenticate(is_staff=True)
+        collection = baker.make(Collection)
+        existing = baker.make(Product, slug='old-one', collection=collection, unit_price=1)
+        body = (
+            'title,slug,unit_price,inventory,collection_id\n'
+            f'Old one,old-one,20,5,{collection.id}\n'
+            f'New one,new-one,30,5,{collection.id}\n'
+            'Broken,broken,-1,5,999999\n'
+            f'Orphan,orphan,10,5,999999\n'
+        )
+
+        # Act
+        response = api_client.post('/store/products/import/', body, content_type='text/csv')
+
+        # Assert
+        existing.refresh_from_db()
+        collection.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 1
+        assert response.data['updated'] == 1
+        assert [error['row'] for error in response.data['errors']] == [3, 4]
+        assert existing.unit_price == 20
+        assert collection.products_count == 2
+
+    def test_if_unknown_content_type_return_415(self, authenticate, api_client):
+        # Arrange
+        authenticate(is_staff=True)
+
+        # Act
+        response = api_client.post('/store/products/import/', {'slug': 'x'}, format='json')
+
+        # Assert
+        assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+
+
+@pytest.mark.django_db
+class TestTagProducts():
+    def tag(self, product, label):
+        TaggedItem.objects.create(content_object=product, tag=Tag.objects.get_or_create(label=label)[0])
+
+    def test_if_tags_are_only_returned_on_request(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        self.tag(product, 'sale')
+
+        # Act
+        default = api_client.get(f'/store/products/{product.id}/')
+        included = api_client.get(f'/store/products/{product.id}/?include=tags')
+
+        # Assert
+        assert 'tags' not in default.data
+        assert included.data['tags'] == ['sale']
+
+    def test_if_list_tags_are_resolved_in_one_query(self, api_client, django_assert_num_queries):
+        # Arrange
+        for product in baker.make(Product, _quantity=5):
+            self.tag(product, 'sale')
+            self.tag(product, 'new')
+
+        # Act
+        with django_assert_num_queries(4):
+            response = api_client.get('/store/products/?fields=id,tags')
+
+        # Assert
+        assert [product['tags'] for product in response.data['results']] == [['new', 'sale']] * 5
+
+    def test_if_tag_filter_returns_tagged_products(self, api_client):
+        # Arrange
+        tagged, untagged = baker.make(Product, _quantity=2)
+        self.tag(tagged, 'sale')
+
+        # Act
+        response = api_client.get('/store/products/?tag=sale')
+
+        # Assert
+        assert [product['id'] for product in response.data['results']] == [tagged.id]
+
+
+@pytest.mark.django_db
+class TestLikeProducts():
+    def like(self, api_client, product, method='post'):
+        api_client.force_authenticate(user=baker.make(settings.AUTH_USER_MODEL))
+        return getattr(api_client, method)(f'/store/products/{product.id}/like/')
+
+    def test_if_user_is_anonymous_returns_401(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+
+        # Act
+        response = api_client.post(f'/store/products/{product.id}/like/')
+
+        # Assert
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_if_liking_twice_counts_once(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        self.like(api_client, product)
+
+        # Act
+        response = api_client.post(f'/store/products/{product.id}/like/')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {'liked': True, 'likes_count': 1}
+        assert Like.objects.count() == 1
+
+    def test_if_unlike_takes_the_like_back(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        self.like(api_client, product)
+
+        # Act
+        response = api_client.delete(f'/store/products/{product.id}/like/')
+
+        # Assert
+        assert response.data == {'liked': False, 'likes_count': 0}
+        assert not Like.objects.exists()
+
+    def test_if_flush_writes_buffered_counts_in_one_update(self, api_client, django_assert_max_num_queries):
+        # Arrange
+        liked, unliked = baker.make(Product, _quantity=2)
+        for _ in range(3):
+            self.like(api_client, liked)
+        self.like(api_client, unliked)
+        api_client.delete(f'/store/products/{unliked.id}/like/')
+
+        # Act
+        with django_assert_max_num_queries(5):
+            flushed = counters.flush(now=time.time() + 2 * counters.BUCKET_SECONDS)
+
+        # Assert
+        liked.refresh_from_db()
+        unliked.refresh_from_db()
+        assert flushed == 1
+        assert (liked.likes_count, unliked.likes_count) == (3, 0)
+        assert counters.pending(liked) == 0
+        assert api_client.get(f'/store/products/{liked.id}/').data['likes_count'] == 3
+
+    def test_if_flushed_delta_keys_expire(self, api_client, monkeypatch):
+        # Arrange
+        product = baker.make(Product)
+        self.like(api_client, product)
+        self.like(api_client, product)
+        counters.flush(now=time.time() + 2 * counters.BUCKET_SECONDS)
+
+        # Act
+        later = time.time() + counters.DELTA_TIMEOUT + 1
+        monkeypatch.setattr(time, 'time', lambda: later)
+
+        # Assert
+        assert counters.pending(product) == 0
+        assert cache.get(counters.delta_key(ContentType.objects.get_for_model(Product).id, product.id)) is None
+
+    def test_if_flush_leaves_the_open_bucket_for_later(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        self.like(api_client, product)
+
+        # Act
+        counters.flush()
+
+        # Assert
+        product.refresh_from_db()
+        assert product.likes_count == 0
+        assert counters.pending(product) == 1
+
+
+@pytest.mark.django_db
+class TestBestsellerProducts():
+    def sell(self, product, quantity, days_ago=0, payment_status=Order.PAYMENT_STATUS_COMPLETE):
+        order = baker.make(Order, customer=baker.make(settings.AUTH_USER_MODEL).customer, payment_status=payment_status)
+        baker.make(OrderItem, order=order, product=product, quantity=quantity, unit_price=product.unit_price)
+        Order.objects.filter(pk=order.pk).update(placed_at=timezone.now() - timedelta(days=days_ago, hours=2))
+
+    def test_if_failed_orders_are_not_counted(self, api_client):
+        # Arrange
+        product = baker.make(Product)
+        self.sell(product, 2)
+        self.sell(product, 4, payment_status=Order.PAYMENT_STATUS_FAILED)
+        rollup_sales()
+
+        # Act
+        response = api_client.get('/store/products/bestsellers/')
+
+        # Assert
+        assert response.data[0]['products'][0]['units_sold'] == 2
+
+    def test_if_returns_top_n_per_collection(self, api_client):
+        # Arrange
+        shoes, hats = baker.make(Collection, _quantity=2)
+        best_shoe, good_shoe, worst_shoe = baker.make(Product, collection=shoes, _quantity=3)
+        hat = baker.make(Product, collection=hats)
+        self.sell(best_shoe, 5)
+        self.sell(good_shoe, 3)
+        self.sell(worst_shoe, 1)
+        self.sell(hat, 1)
+        self.sell(worst_shoe, 10, days_ago=60)
+        rollup_sales(max_chunks=100)
+
+        # Act
+        response = api_client.get('/store/products/bestsellers/?limit=2')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert {
+            row['collection']: [(product['id'], product['units_sold']) for product in row['products']]
+            for row in response.data
+        } == {
+            shoes.id: [(best_shoe.id, 5), (good_shoe.id, 3)],
+            hats.id: [(hat.id, 1)],
+        }
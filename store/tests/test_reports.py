@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from model_bakery import baker
+from store.models import Collection, DailySales, HourlySales, Order, OrderItem, Product
+from store.rollups import refresh_sales, rollup_sales
+
+
+def place_order(placed_at, *lines, payment_status=Order.PAYMENT_STATUS_COMPLETE):
+    order = baker.make(Order, customer=baker.make(settings.AUTH_USER_MODEL).customer, payment_status=payment_status)
+    for product, quantity in lines:
+        baker.make(OrderItem, order=order, product=product, quantity=quantity, unit_price=product.unit_price)
+    Order.objects.filter(pk=order.pk).update(placed_at=placed_at)
+    return order
+
+
+@pytest.fixture
+def products():
+    collection = baker.make(Collection)
+    return baker.make(Product, collection=collection, unit_price=Decimal('10.00'), _quantity=2)
+
+
+@pytest.mark.django_db
+class TestSalesRollups():
+    def test_if_every_level_counts_orders_once(self, products):
+        # Arrange
+        hour = datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc)
+        place_order(hour + timedelta(minutes=5), (products[0], 1), (products[1], 2))
+        place_order(hour + timedelta(minutes=50), (products[0], 1))
+
+        # Act
+        rollup_sales()
+
+        # Assert
+        total = HourlySales.objects.get(period=hour, collection__isnull=True)
+        per_collection = HourlySales.objects.get(period=hour, collection__isnull=False, product__isnull=True)
+        assert (total.orders, total.units, total.revenue) == (2, 4, Decimal('40.00'))
+        assert (per_collection.orders, per_collection.units) == (2, 4)
+        assert HourlySales.objects.get(product=products[0]).orders == 2
+        assert DailySales.objects.get(period=datetime(2026, 1, 5, tzinfo=dt_timezone.utc),
+                                      collection__isnull=True).orders == 2
+
+    def test_if_rollup_continues_from_the_high_water_mark(self, products):
+        # Arrange
+        place_order(datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc), (products[0], 1))
+        rollup_sales()
+        place_order(datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc) + timedelta(days=400), (products[0], 1))
+
+        # Act
+        hours = rollup_sales()
+
+        # Assert
+        assert 0 < hours <= 7 * 24
+        assert HourlySales.objects.filter(collection__isnull=True).count() == 1
+
+    def test_if_orders_still_being_placed_wait_for_next_run(self, products):
+        # Arrange
+        place_order(timezone.now(), (products[0], 1))
+
+        # Act
+        rollup_sales()
+
+        # Assert
+        assert not HourlySales.objects.exists()
+
+    def test_if_payment_status_change_is_refreshed(self, products):
+        # Arrange
+        placed_at = datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc)
+        order = place_order(placed_at, (products[0], 1), payment_status=Order.PAYMENT_STATUS_PENDING)
+        rollup_sales()
+        Order.objects.filter(pk=order.pk).update(payment_status=Order.PAYMENT_STATUS_COMPLETE)
+
+        # Act
+        refresh_sales([placed_at])
+
+        # Assert
+        assert set(HourlySales.objects.values_list('payment_status', flat=True)) == {Order.PAYMENT_STATUS_COMPLETE}
+
+    def test_if_saved_order_is_refreshed_only_when_payment_status_changes(self, products,
+                                                                         django_capture_on_commit_callbacks):
+        # Arrange
+        placed_at = datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc)
+        order = place_order(placed_at, (products[0], 1), payment_status=Order.PAYMENT_STATUS_PENDING)
+        rollup_sales()
+        order.refresh_from_db()
+
+        # Act
+        with django_capture_on_commit_callbacks() as unchanged:
+            order.save()
+        order.payment_status = Order.PAYMENT_STATUS_COMPLETE
+        with django_capture_on_commit_callbacks(execute=True) as changed:
+            order.save()
+
+        # Assert
+        assert len(unchanged) == 0
+        assert len(changed) == 1
+        assert set(HourlySales.objects.values_list('payment_status', flat=True)) == {Order.PAYMENT_STATUS_COMPLETE}
+
+    def test_if_deleted_order_is_refreshed(self, products, django_capture_on_commit_callbacks):
+        # Arrange
+        placed_at = datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc)
+        order = place_order(placed_at, (products[0], 1))
+        rollup_sales()
+        order.refresh_from_db()
+
+        # Act
+        with django_capture_on_commit_callbacks(execute=True):
+            order.items.all().delete()
+            order.delete()
+
+        # Assert
+        assert not HourlySales.objects.exists()
+        assert not DailySales.objects.exists()
+
+    def test_if_backfill_rebuilds_range_in_chunks(self, products):
+        # Arrange
+        place_order(datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc), (products[0], 1))
+        place_order(datetime(2026, 1, 7, 10, tzinfo=dt_timezone.utc), (products[0], 1))
+
+        # Act
+        call_command('backfill_sales_reports', start='2026-01-01', end='2026-01-10', chunk_hours=24)
+
+        # Assert
+        assert DailySales.objects.filter(collection__isnull=True).count() == 2
+
+
+@pytest.mark.django_db
+class TestSalesReports():
+    def test_if_user_is_not_admin_returns_403(self, authenticate, api_client):
+        # Arrange
+        authenticate()
+
+        # Act
+        response = api_client.get('/store/reports/')
+
+        # Assert
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_report_reads_date_range_from_rollups(self, authenticate, api_client, products,
+                                                     django_assert_num_queries):
+        # Arrange
+        place_order(datetime(2026, 1, 5, 10, tzinfo=dt_timezone.utc), (products[0], 1))
+        place_order(datetime(2026, 1, 6, 10, tzinfo=dt_timezone.utc), (products[1], 3))
+        place_order(datetime(2026, 2, 1, 10, tzinfo=dt_timezone.utc), (products[1], 1))
+        rollup_sales(max_chunks=100)
+        authenticate(is_staff=True)
+
+        # Act
+        with django_assert_num_queries(2):
+            response = api_client.get('/store/reports/?start=2026-01-01&end=2026-01-31&group_by=product')
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert [(row['product_id'], row['units'], row['revenue']) for row in response.data['results']] == [
+            (products[0].id, 1, Decimal('10.00')),
+            (products[1].id, 3, Decimal('30.00')),
+        ]
+
+    @pytest.mark.parametrize('query', ['product_id=abc', 'payment_status=X', 'granularity=week', 'start=yesterday'])
+    def test_if_query_is_invalid_returns_400(self, authenticate, api_client, query):
+        # Arrange
+        authenticate(is_staff=True)
+
+        # Act
+        response = api_client.get(f'/store/reports/?{query}')
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
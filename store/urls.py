@@ -4,7 +4,7 @@ from django.urls import path, include
 from rest_framework_nested.routers import DefaultRouter, NestedDefaultRouter
 
 from .views import ProductViewSet, CollectionViewSet, ReviewViewSet, CartViewSet, CartItemViewSet, CustomerViewSet, \
-    OrderViewSet, OrderItemViewSet, ProductImageViewSet
+    OrderViewSet, OrderItemViewSet, ProductImageViewSet, SalesReportViewSet
 
 router = DefaultRouter()
 router.register('products', ProductViewSet, basename='products')
@@ -12,6 +12,7 @@ router.register('collections', CollectionViewSet, basename='collections')
 router.register('carts', CartViewSet, basename='carts')
 router.register('customers', CustomerViewSet, basename='customer')
 router.register('orders', OrderViewSet, basename='order')
+router.register('reports', SalesReportViewSet, basename='reports')
 
 product_router = NestedDefaultRouter(router, 'products', lookup='product')
 product_router.register('reviews', ReviewViewSet, basename='product-reviews' )
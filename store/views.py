@@ -1,8 +1,12 @@
-from django.db.models import Count
+from datetime import timedelta
+
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
 from rest_framework import status, viewsets, permissions
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.exceptions import NotFound, UnsupportedMediaType, ValidationError
 from rest_framework.response import Response
 from rest_framework.mixins import CreateModelMixin, RetrieveModelMixin, DestroyModelMixin
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet, GenericViewSet
@@ -13,27 +17,43 @@ from rest_framework.views import APIView
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView
 from rest_framework.status import HTTP_404_NOT_FOUND
 
-from .pagination import DefaultPagination
-from .filters import ProductFilter
-from .models import Product, Collection, OrderItem, Review, Cart, CartItem, Customer, Order, ProductImage
+from likes import counters as likes
+from .carts import get_cart_storage
+from .claims import get_claim, get_customer_id
+from .exports import iter_rows, stream_csv, stream_ndjson
+from .fieldsets import get_requested_fields
+from .idempotency import idempotent
+from .imports import import_products, read_rows
+from .inventory import InsufficientStock, find_shortages
+from .pricing import annotate_best_discount, annotate_line_totals, annotate_order_totals
+from .rollups import top_sellers
+from .conditional import ConditionalGetMixin
+from .caching import CachedReadMixin, PRODUCTS, COLLECTIONS
+from .payments import NOT_ALLOWED, NOT_FOUND, transition_payment_statuses
+from .pagination import DefaultPagination, OptionalPagination
+from .filters import ProductFilter, FullTextSearchFilter, SearchRankOrderingFilter
+from .models import Product, Collection, OrderItem, Review, Customer, Order, ProductImage, HourlySales, DailySales
 from .permissions import IsAdminOrReadOnly, FullDjangoModelPermissions, ViewCustomerHistoryPermissions
 from .serializers import ProductSerializer, CollectionSerializer, ReviewSerializer, CartSerializer, CartItemSerializer, \
     AddCartItemSerializer, UpdateCartItemSerializer, CustomerSerializer, OrderSerializer, OrderItemSerializer, \
-    CreateOrderSerializer, UpdateOrderSerializer, SimpleCustomerSerializer, ProductImageSerializer
+    CreateOrderSerializer, UpdateOrderSerializer, SimpleCustomerSerializer, ProductImageSerializer, \
+    SalesReportSerializer, SalesReportQuerySerializer, BulkUpdateOrderSerializer
 
 
 # Create your views here.
 
-class ProductViewSet(ModelViewSet):
-    queryset = Product.objects.prefetch_related('images').all()
+class ProductViewSet(CachedReadMixin, ConditionalGetMixin, ModelViewSet):
+    cache_namespace = PRODUCTS
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, SearchRankOrderingFilter]
     # filterset_fields = ['collection_id']
     filterset_class = ProductFilter
     pagination_class = DefaultPagination
     permission_classes = [IsAdminOrReadOnly]
     search_fields = ['title', 'description']
+    search_trigram_field = 'title'
     ordering_fields = ['unit_price', 'last_update']
+    ordering = ['title']
 
 
     # Instead of the django_filter
@@ -44,9 +64,88 @@ class ProductViewSet(ModelViewSet):
     #         queryset = queryset.filter(collection_id=collection_id)
     #     return queryset
 
+    def get_queryset(self):
+        queryset = Product.objects.all()
+        fields = get_requested_fields(self.request, ProductSerializer.Meta.fields)
+
+        if 'images' in fields:
+            queryset = queryset.prefetch_related('images')
+
+        if 'discounted_price' in fields or 'price_with_tax' in fields:
+            queryset = annotate_best_discount(queryset)
+
+        deferred = [field for field in ['description', 'slug', 'inventory'] if field not in fields]
+        return queryset.defer('search_vector', *deferred)
+
     def get_serializer_context(self):
         return {'request': self.request}
 
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def export(self, request):
+        # `format` is taken by DRF's content negotiation, hence `output`.
+        output = request.query_params.get('output', 'ndjson')
+        if output not in ['ndjson', 'csv']:
+            return Response({'error': 'output must be either ndjson or csv.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        rows = iter_rows(queryset, serializer)
+
+        if output == 'csv':
+            response = StreamingHttpResponse(stream_csv(rows, list(serializer.fields)), content_type='text/csv')
+        else:
+            response = StreamingHttpResponse(stream_ndjson(rows), content_type='application/x-ndjson')
+        response['Content-Disposition'] = f'attachment; filename="products.{output}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser])
+    def bulk_import(self, request):
+        formats = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson'}
+        content_type = request.content_type.split(';')[0].strip()
+        if content_type not in formats:
+            raise UnsupportedMediaType(content_type)
+
+        result = import_products(read_rows(request.stream or [], formats[content_type]))
+        return Response(result)
+
+    @action(detail=False)
+    def bestsellers(self, request):
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), 365)
+            limit = min(max(int(request.query_params.get('limit', 5)), 1), 50)
+            collection_id = request.query_params.get('collection_id')
+            collection_id = int(collection_id) if collection_id else None
+        except ValueError:
+            return Response({'error': 'days, limit and collection_id must be integers.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        collections = {}
+        for row in top_sellers(days, limit, collection_id):
+            collections.setdefault(row['product__collection_id'], []).append({
+                'id': row['product_id'],
+                'title': row['product__title'],
+                'unit_price': row['product__unit_price'],
+                'units_sold': row['units_sold'],
+            })
+
+        return Response([
+            {'collection': collection, 'products': products} for collection, products in collections.items()
+        ])
+
+    @action(detail=True, methods=['post', 'delete'], permission_classes=[IsAuthenticated])
+    def like(self, request, pk):
+        product = self.get_object()
+        if request.method == 'POST':
+            likes.like(request.user, product)
+        else:
+            likes.unlike(request.user, product)
+
+        # likes_count on the product lags behind until the next flush.
+        return Response({
+            'liked': request.method == 'POST',
+            'likes_count': product.likes_count + likes.pending(product),
+        })
+
     def destroy(self, request, *args, **kwargs):
         if OrderItem.objects.filter(product_id=kwargs['pk']).count() > 0:
             return Response({'error': 'Product cannot be deleted because it is associated with an order item.'},
@@ -55,8 +154,9 @@ class ProductViewSet(ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class CollectionViewSet(ModelViewSet):
-    queryset = Collection.objects.annotate(products_count=Count('products')).all()
+class CollectionViewSet(CachedReadMixin, ConditionalGetMixin, ModelViewSet):
+    cache_namespace = COLLECTIONS
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [IsAdminOrReadOnly]
 
@@ -73,6 +173,8 @@ class CollectionViewSet(ModelViewSet):
 
 class ReviewViewSet(ModelViewSet):
     serializer_class = ReviewSerializer
+    pagination_class = OptionalPagination
+    ordering = ['-date']
 
     def get_queryset(self):
         return Review.objects.filter(product_id=self.kwargs['product_pk'])
@@ -82,12 +184,35 @@ class ReviewViewSet(ModelViewSet):
 
 
 class CartViewSet(CreateModelMixin, RetrieveModelMixin, DestroyModelMixin, GenericViewSet):
-    queryset = Cart.objects.prefetch_related('items__product').all()
     serializer_class = CartSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def get_object(self):
+        cart = get_cart_storage().get(self.kwargs['pk'])
+        if cart is None:
+            raise NotFound()
+        return cart
+
+    def perform_create(self, serializer):
+        serializer.instance = get_cart_storage().create()
+
+    def perform_destroy(self, instance):
+        get_cart_storage().delete(instance.pk)
+
+    @action(detail=True, methods=['post'])
+    def persist(self, request, pk):
+        cart = get_cart_storage().persist(pk)
+        if cart is None:
+            raise NotFound()
+        return Response(self.get_serializer(cart).data)
+
 
 class CartItemViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete']
+    pagination_class = OptionalPagination
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -96,11 +221,56 @@ class CartItemViewSet(viewsets.ModelViewSet):
             return UpdateCartItemSerializer
         return CartItemSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def get_serializer(self, *args, **kwargs):
+        # A list adds every item in one statement.
+        if isinstance(kwargs.get('data'), list):
+            kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
     def get_serializer_context(self):
         return {'cart_id': self.kwargs['cart_pk']}
 
     def get_queryset(self):
-        return CartItem.objects.filter(cart_id=self.kwargs['cart_pk']).select_related('product')
+        # A plain list when the cart lives in the cache.
+        return get_cart_storage().get_items(self.kwargs['cart_pk'])
+
+    def paginate_queryset(self, queryset):
+        # The keyset pager ranges over rows, which a cached cart doesn't have.
+        if isinstance(queryset, list) and \
+                self.request.query_params.get(self.paginator.mode_query_param) == 'cursor':
+            raise ValidationError({self.paginator.mode_query_param: ['Cursor pagination is not available '
+                                                                     'for carts that are not persisted.']})
+        return super().paginate_queryset(queryset)
+
+    def get_object(self):
+        item = get_cart_storage().get_item(self.kwargs['cart_pk'], self.kwargs['pk'])
+        if item is None:
+            raise NotFound()
+        return item
+
+    def perform_update(self, serializer):
+        serializer.instance = get_cart_storage().update_item(
+            self.kwargs['cart_pk'], serializer.instance.pk, serializer.validated_data['quantity'])
+
+    def perform_destroy(self, instance):
+        get_cart_storage().delete_item(self.kwargs['cart_pk'], instance.pk)
+
+
+def with_totals(orders, request):
+    """Orders with their items, and totals summed in SQL when the response includes them."""
+    fields = get_requested_fields(request, OrderSerializer.Meta.fields)
+    if 'total_price' in fields:
+        orders = annotate_order_totals(orders)
+    if 'items' in fields:
+        # Only the columns OrderItemSerializer and SimpleProductSerializer read.
+        items = OrderItem.objects.select_related('product') \
+            .only('id', 'order_id', 'quantity', 'unit_price', 'product__id', 'product__title', 'product__unit_price')
+        orders = orders.prefetch_related(Prefetch('items', queryset=annotate_line_totals(items)))
+    return orders
 
 
 class CustomerViewSet(ModelViewSet):
@@ -120,7 +290,7 @@ class CustomerViewSet(ModelViewSet):
 
     @action(detail=False, methods=['get', 'put'], permission_classes=[IsAuthenticated])
     def me(self, request):
-        customer = Customer.objects.get(user_id=request.user.id)
+        customer = Customer.objects.get(pk=get_customer_id(request))
         if request.method == 'GET':
             # serializer = SimpleCustomerSerializer(customer)
             serializer = self.get_serializer(customer)
@@ -136,7 +306,8 @@ class CustomerViewSet(ModelViewSet):
 
     @action(detail=True, permission_classes=[ViewCustomerHistoryPermissions])
     def history(self, request, pk):
-        return Response('OK')
+        orders = with_totals(Order.objects.filter(customer_id=pk).order_by('-placed_at'), request)
+        return Response(OrderSerializer(orders, many=True, context={'request': request}).data)
 
 
 class OrderItemViewSet(viewsets.ModelViewSet):
@@ -145,21 +316,56 @@ class OrderItemViewSet(viewsets.ModelViewSet):
 
 class OrderViewSet(ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+    pagination_class = DefaultPagination
+    ordering = ['-placed_at']
 
     def get_permissions(self):
-        if self.request.method in ['PATCH', 'DELETE']:
+        if self.request.method in ['PATCH', 'DELETE'] or self.action == 'payment_status':
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
+    @action(detail=False, methods=['post'], url_path='payment-status')
+    def payment_status(self, request):
+        """Apply `{"transitions": [{"order_id": ..., "payment_status": ...}, ...]}` and report each order's outcome."""
+        serializer = BulkUpdateOrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        outcomes = transition_payment_statuses(serializer.validated_data['transitions'])
+        return Response({'results': [{'order_id': order_id, 'outcome': outcome}
+                                     for order_id, outcome in outcomes.items()]})
+
+    def partial_update(self, request, *args, **kwargs):
+        # Goes through the same transitions as the bulk endpoint.
+        order = self.get_object()
+        serializer = UpdateOrderSerializer(order, data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        target = serializer.validated_data.get('payment_status', order.payment_status)
+        outcome = transition_payment_statuses({order.id: target})[order.id]
+        if outcome == NOT_FOUND:
+            raise NotFound()
+        elif outcome == NOT_ALLOWED:
+            return Response({'error': f"An order can't move from {order.get_payment_status_display()} "
+                                      f"to {dict(Order.PAYMENT_CHOICES)[target]}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        order.payment_status = target
+        return Response(UpdateOrderSerializer(order).data)
+
+    @idempotent
     def create(self, request, *args, **kwargs):
-        serializer = CreateOrderSerializer(data=request.data, context={'user_id': self.request.user.id})
+        serializer = CreateOrderSerializer(data=request.data, context={'customer_id': get_customer_id(request)})
         serializer.is_valid(raise_exception=True)
-        order = serializer.save()
+        try:
+            order = serializer.save()
+        except InsufficientStock as error:
+            # Read after the rollback, so the reservations that did go through are back.
+            return Response({'error': 'Some items are out of stock.', 'items': find_shortages(error.quantities)},
+                            status=status.HTTP_409_CONFLICT)
         serializer = OrderSerializer(order)
         return Response(serializer.data)
 
     def get_serializer_class(self):
-        if self.request.method == 'POST':
+        if self.action == 'payment_status':
+            return BulkUpdateOrderSerializer
+        elif self.request.method == 'POST':
             return CreateOrderSerializer
         elif self.request.method == 'PATCH':
             return UpdateOrderSerializer
@@ -168,14 +374,57 @@ class OrderViewSet(ModelViewSet):
     def get_queryset(self):
         user = self.request.user
 
-        if user.is_staff:
-            return Order.objects.all()
+        orders = Order.objects.order_by(*self.ordering, '-id')
+        if not user.is_staff:
+            customer_id = get_claim(self.request, 'customer_id')
+            if customer_id is not None:
+                orders = orders.filter(customer_id=customer_id)
+            else:
+                orders = orders.filter(customer__user_id=user.id)
+
+        return with_totals(orders, self.request)
+
+
+class SalesReportViewSet(GenericViewSet):
+    """
+    Sales between `?start=` and `?end=` (dates or datetimes, end exclusive) per
+    `?granularity=hour|day`, broken down `?group_by=payment_status|collection|product`,
+    read from the sales rollups.
+    """
+    permission_classes = [IsAdminUser]
+    pagination_class = DefaultPagination
+    serializer_class = SalesReportSerializer
+
+    # group_by: (fields reported, rows of that level)
+    levels = {
+        'payment_status': ([], {'collection__isnull': True, 'product__isnull': True}),
+        'collection': (['collection_id'], {'collection__isnull': False, 'product__isnull': True}),
+        'product': (['collection_id', 'product_id'], {'product__isnull': False}),
+    }
+
+    def list(self, request):
+        query = SalesReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        end = params.get('end') or timezone.now()
+        start = params.get('start') or end - timedelta(days=30)
+
+        fields, level = self.levels[params['group_by']]
+        model = HourlySales if params['granularity'] == 'hour' else DailySales
+        rows = model.objects.filter(period__gte=start, period__lt=end, **level)
+        for name in ['payment_status', 'collection_id', 'product_id']:
+            if name in params:
+                rows = rows.filter(**{name: params[name]})
+
+        rows = rows.order_by('period', 'payment_status', *fields) \
+            .values('period', 'payment_status', *fields, 'orders', 'units', 'revenue')
 
-        customer_id = Customer.objects.only('id').get(user_id=user.id)
-        return Order.objects.filter(customer_id=customer_id)
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
 
 
-class ProductImageViewSet(ModelViewSet):
+class ProductImageViewSet(ConditionalGetMixin, ModelViewSet):
     serializer_class = ProductImageSerializer
 
     def get_queryset(self):
@@ -1,4 +1,9 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
 from django.db import models
+from django.db.models import Q
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
@@ -9,6 +14,30 @@ class TaggedItemManager(models.Manager):
         content_type = ContentType.objects.get_for_model(obj_type)
         return TaggedItem.objects.select_related('tag').filter(content_type=content_type, object_id=obj_id)
 
+    def get_tags_for_objects(self, objects):
+        """
+        Resolve the tags of many objects, of any mix of models, in one query.
+        Returns {(content_type_id, object_id): [Tag, ...]}.
+        """
+        objects = list(objects)
+        if not objects:
+            return {}
+
+        content_types = ContentType.objects.get_for_models(*{type(obj) for obj in objects})
+        ids_by_content_type = defaultdict(set)
+        for obj in objects:
+            ids_by_content_type[content_types[type(obj)].id].add(obj.pk)
+
+        condition = reduce(or_, [
+            Q(content_type_id=content_type_id, object_id__in=ids)
+            for content_type_id, ids in ids_by_content_type.items()
+        ])
+
+        tags = defaultdict(list)
+        for tagged_item in self.select_related('tag').filter(condition):
+            tags[(tagged_item.content_type_id, tagged_item.object_id)].append(tagged_item.tag)
+        return tags
+
 class Tag(models.Model):
     label = models.CharField(max_length=255)
 
@@ -33,3 +62,7 @@ class TaggedItem(models.Model):
 
     class Meta:
         ordering = ['tag']
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+            models.Index(fields=['tag', 'content_type']),
+        ]